@@ -2,6 +2,7 @@
 配置文件
 包含应用的全局配置和共享状态
 """
+import os
 
 # Flask 配置
 
@@ -12,6 +13,9 @@ PORT = 5000
 # 如果为 None，则使用自动检测到的局域网 IP 或回环地址
 PUBLIC_HOST = None
 
+# 本地缓存目录：保存已结束对局详情等不可变数据（打包后同样可写）
+CACHE_DIR = os.path.join(os.environ.get('LOCALAPPDATA') or os.path.expanduser('~'), 'LCU-UI', 'cache')
+
 # 全局状态变量
 class AppState:
     """应用全局状态管理"""
@@ -1,6 +1,7 @@
 import os
 import json
-from functools import lru_cache
+from functools import cache, lru_cache
+from types import MappingProxyType
 
 # --- LCU 根路径查找函数 ---
 
@@ -164,4 +165,34 @@ def get_augment_info_by_id(augment_id):
         dict: {'name': '中文名称', 'desc': '中文描述'} 或 None
     """
     info_dict = _get_augment_info_map()  # 使用延迟加载
-    return info_dict.get(augment_id)
\ No newline at end of file
+    return info_dict.get(augment_id)
+
+@cache
+def get_augment_table(version='15.19'):
+    """
+    获取预编译的海克斯天赋只读索引（每个版本只构建一次）
+
+    Args:
+        version: CDN版本号，默认为 '15.19'
+
+    Returns:
+        MappingProxyType: {augment_id: (图标URL, 中文名称, 中文描述)}，
+        图标或信息缺失的项为 None
+    """
+    names_dict = _get_augment_names()
+    info_dict = _get_augment_info_map()
+
+    table = {}
+    for augment_id in set(names_dict) | set(info_dict):
+        name = names_dict.get(augment_id)
+        icon = f'https://raw.communitydragon.org/{version}/game/assets/ux/cherry/augments/icons/{name}_large.png' if name else None
+        info = info_dict.get(augment_id)
+        if info and isinstance(info, dict):
+            table[augment_id] = (
+                icon,
+                info.get('name', '') or info.get('title', ''),
+                info.get('desc', '') or info.get('description', ''),
+            )
+        else:
+            table[augment_id] = (icon, None, None)
+    return MappingProxyType(table)
\ No newline at end of file
@@ -32,6 +32,8 @@ from .client import LCUClient
 from .summoner import SummonerAPI
 from .game_flow import GameFlowAPI
 from .match_history import MatchHistoryAPI
+from .match_cache import MatchDetailCache
+from core.store import codec
 from .live_client import LiveClientAPI
 from .enrichment import EnrichmentService, enrich_game_with_augments
 
@@ -39,17 +41,30 @@ class LCU:
     """聚合型 LCU 入口，内部复用单一 LCUClient。"""
 
     def __init__(self, token, port):
+        from config import CACHE_DIR
+
         self.client = LCUClient(token, port)
         self.summoner = SummonerAPI(self.client)
         self.game_flow = GameFlowAPI(self.client)
-        self.match_history = MatchHistoryAPI(self.client)
+        self.match_history = MatchHistoryAPI(self.client, cache_dir=CACHE_DIR)
         self.enrichment = EnrichmentService(self.summoner)
         self.live_client = LiveClientAPI(self.summoner)
+        # 已补全的对局详情缓存（按 gameId，内存 LRU + 磁盘）
+        self.match_details = MatchDetailCache(CACHE_DIR)
+        self._current_puuid = None
 
     # 召唤师信息
     def get_current_summoner(self):
         return self.summoner.get_current_summoner()
 
+    def get_current_puuid(self):
+        """当前登录召唤师的 puuid；同一客户端会话内不会变化，只查询一次。"""
+        if self._current_puuid is None:
+            summoner = self.get_current_summoner()
+            if isinstance(summoner, dict):
+                self._current_puuid = summoner.get('puuid')
+        return self._current_puuid
+
     def get_puuid(self, summoner_name):
         return self.summoner.get_puuid(summoner_name)
 
@@ -95,16 +110,50 @@ class LCU:
     def get_match_history(self, puuid, count=20, begin_index=0):
         return self.match_history.get_match_history(puuid, count=count, begin_index=begin_index)
 
+    def get_match_summaries(self, puuid, count=20, begin_index=0):
+        return self.match_history.get_match_summaries(puuid, count=count, begin_index=begin_index)
+
+    def resolve_game_id(self, puuid, index):
+        return self.match_history.resolve_game_id(puuid, index)
+
     def get_tft_match_history(self, puuid, count=20):
         return self.match_history.get_tft_match_history(puuid, count=count)
 
     def get_match_by_id(self, match_id):
         return self.match_history.get_match_by_id(match_id)
 
+    def get_match_timeline(self, game_id):
+        return self.match_history.get_match_timeline(game_id)
+
+    def get_match_cache_stats(self):
+        return {
+            'history': self.match_history.cache_stats(),
+            'details': self.match_details.stats(),
+            'codec': codec.codec_stats(),
+        }
+
     # 实时对局
     def get_all_players_from_game(self):
         return self.live_client.get_all_players_from_game()
 
+    def get_live_game(self):
+        return self.live_client.get_live_game()
+
+    def seed_live_puuids(self, players):
+        return self.live_client.seed_puuids(players)
+
+    def reset_live_puuids(self):
+        return self.live_client.reset_puuids()
+
+    def reset_live_events(self):
+        return self.live_client.events.reset()
+
+    def get_live_events(self, since=0):
+        """拉取新事件后返回缓冲区中 EventID >= since 的事件；不在游戏中时返回 None。"""
+        if self.live_client.poll_events() is None:
+            return None
+        return self.live_client.events.since(since)
+
     # 数据增强
     def enrich_game_with_summoner_info(self, game):
         return self.enrichment.enrich_game_with_summoner_info(game)
@@ -112,6 +161,12 @@ class LCU:
     def enrich_tft_game_with_summoner_info(self, game):
         return self.enrichment.enrich_tft_game_with_summoner_info(game)
 
+    def plan_summoner_enrichment(self, game):
+        return self.enrichment.plan_summoner_enrichment(game)
+
+    def resolve_summoner_enrichment(self, pending, on_resolved=None):
+        return self.enrichment.resolve_pending(pending, on_resolved)
+
     def create_lobby(self):
         return self.game_flow.create_lobby()
     
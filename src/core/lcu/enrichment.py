@@ -1,16 +1,57 @@
 """
 数据增强模块（面向对象）
 """
-from constants import get_augment_icon_url, get_augment_info
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from constants import get_augment_table
+from utils.logger import logger
+
+
+# 补全召唤师信息时的最大并发请求数
+ENRICH_WORKERS = 4
+
+# 每个海克斯槽位: (ID 字段, 图标字段, 名称字段, 描述字段)
+AUGMENT_SLOTS = tuple(
+    (f'playerAugment{i}', f'augmentIcon{i}', f'augmentName{i}', f'augmentDesc{i}') for i in range(1, 7)
+)
+_MISSING_AUGMENT = (None, None, None)
+
+
+def _riot_id(game_name, tag_line):
+    return f"{game_name}#{tag_line}" if tag_line else game_name
+
+
+def is_enriched(p):
+    """参与者的名称、头像与 puuid 是否都已补齐。"""
+    return bool(p.get('summonerName')) and p.get('profileIcon') is not None and bool(p.get('puuid'))
 
 
 class EnrichmentService:
+    """
+    对局参与者信息补全。
+
+    先用对局数据本身（riotId 字段、participantIdentities）与身份缓存填充，
+    只对仍缺少名称/头像/puuid 的参与者去重后批量查询 LCU，并在有限线程池中并发执行。
+    """
+
     def __init__(self, summoner_api):
         self.summoner_api = summoner_api
 
     def enrich_game_with_summoner_info(self, game):
+        pending = self.plan_summoner_enrichment(game)
+        if pending:
+            self.resolve_pending(pending)
+        return game
+
+    def plan_summoner_enrichment(self, game):
+        """
+        只用对局数据与缓存填充参与者（不发起请求）。
+
+        Returns:
+            list: 仍缺少名称/头像/puuid 的 (participant, lookup) 列表，交给 resolve_pending 查询
+        """
         if not game or not isinstance(game, dict):
-            return game
+            return []
 
         participants = game.get('participants') or []
 
@@ -21,65 +62,138 @@ class EnrichmentService:
             if pid is not None:
                 idents[pid] = player
 
+        pending = []
         for p in participants:
             try:
-                if not p.get('summonerName'):
-                    game_name = p.get('riotIdGameName') or p.get('riotId') or None
-                    tag_line = p.get('riotIdTagline') or p.get('riotTagLine') or ''
-                    if game_name:
-                        p['summonerName'] = f"{game_name}#{tag_line}" if tag_line else game_name
-
-                info = None
-
-                puuid = p.get('puuid') or (p.get('player') or {}).get('puuid')
-                if puuid:
-                    info = self.summoner_api.get_summoner_by_puuid(puuid)
-
-                if not info:
-                    sid = p.get('summonerId') or (p.get('player') or {}).get('summonerId')
-                    if sid:
-                        info = self.summoner_api.get_summoner_by_id(sid)
-
-                if not info:
-                    name = p.get('summonerName') or (p.get('player') or {}).get('summonerName')
-                    if name:
-                        info = self.summoner_api.get_summoner_by_name(name)
-
-                if info and isinstance(info, dict):
-                    p['summonerName'] = (
-                        info.get('displayName') or
-                        info.get('summonerName') or
-                        info.get('gameName') or
-                        p.get('summonerName')
-                    )
-
-                    if 'profileIconId' in info:
-                        p['profileIcon'] = info.get('profileIconId')
-                    elif 'profileIcon' in info:
-                        p['profileIcon'] = info.get('profileIcon')
-
-                    if 'puuid' in info:
-                        p['puuid'] = info.get('puuid')
-
-                if (not p.get('summonerName')) and p.get('participantId') and idents.get(p.get('participantId')):
-                    player = idents.get(p.get('participantId')) or {}
-                    game_name = (player.get('gameName') or player.get('summonerName')) or ''
-                    tag = player.get('tagLine')
-
-                    if game_name:
-                        p['summonerName'] = f"{game_name}{('#'+tag) if tag else ''}"
-
-                    if player.get('profileIcon') is not None and not p.get('profileIcon'):
-                        p['profileIcon'] = player.get('profileIcon')
-
-                    if player.get('puuid') and not p.get('puuid'):
-                        p['puuid'] = player.get('puuid')
-
+                self._fill_from_payload(p, idents.get(p.get('participantId')))
+                if is_enriched(p):
+                    continue
+                lookup = self._lookup_key(p)
+                if lookup:
+                    pending.append((p, lookup))
             except Exception as e:
                 print(f"enrich参与者信息失败: {e}")
                 continue
 
-        return game
+        return pending
+
+    def resolve_pending(self, pending, on_resolved=None):
+        """
+        并发查询 plan_summoner_enrichment 返回的参与者；每名参与者补全后回调 on_resolved(participant)。
+
+        Returns:
+            list: 查询失败或查询结果仍未补齐字段的 (participant, lookup)
+        """
+        return self._resolve_pending(pending, self._apply_identity, on_resolved, is_done=is_enriched)
+
+    def _fill_from_payload(self, p, player):
+        if not p.get('summonerName'):
+            game_name = p.get('riotIdGameName') or p.get('riotId') or None
+            tag_line = p.get('riotIdTagline') or p.get('riotTagLine') or ''
+            if game_name:
+                p['summonerName'] = _riot_id(game_name, tag_line)
+
+        if not p.get('puuid') and (p.get('player') or {}).get('puuid'):
+            p['puuid'] = p['player']['puuid']
+
+        if player:
+            # 对局自带的身份信息完整时顺便写入缓存，供后续对局与实时数据使用；
+            # 缺少头像等字段的不缓存，否则之后按 puuid 查询会命中这份残缺信息
+            if player.get('profileIcon') is not None and (player.get('gameName') or player.get('summonerName')):
+                self.summoner_api.remember_identity(player)
+
+            game_name = (player.get('gameName') or player.get('summonerName')) or ''
+            if game_name and not p.get('summonerName'):
+                p['summonerName'] = _riot_id(game_name, player.get('tagLine'))
+
+            if player.get('profileIcon') is not None and p.get('profileIcon') is None:
+                p['profileIcon'] = player.get('profileIcon')
+
+            if player.get('puuid') and not p.get('puuid'):
+                p['puuid'] = player.get('puuid')
+
+            if player.get('summonerId') and not p.get('summonerId'):
+                p['summonerId'] = player.get('summonerId')
+
+        if p.get('puuid'):
+            identity = self.summoner_api.get_cached_identity(p['puuid'])
+            if identity:
+                self._apply_identity(p, identity)
+
+    @staticmethod
+    def _lookup_key(p):
+        """按 puuid > summonerId > 名称 的优先级选择一种查询方式。"""
+        player = p.get('player') or {}
+        puuid = p.get('puuid') or player.get('puuid')
+        if puuid:
+            return ('puuid', puuid)
+        sid = p.get('summonerId') or player.get('summonerId')
+        if sid:
+            return ('id', sid)
+        name = p.get('summonerName') or player.get('summonerName')
+        if name:
+            return ('name', name)
+        return None
+
+    def _resolve(self, lookup):
+        kind, value = lookup
+        try:
+            if kind == 'puuid':
+                # plan 阶段已查过身份缓存，仍待查询说明缓存不够用，直接请求 LCU
+                return self.summoner_api.remember_identity(self.summoner_api.get_summoner_by_puuid(value))
+            if kind == 'id':
+                return self.summoner_api.remember_identity(self.summoner_api.get_summoner_by_id(value))
+            return self.summoner_api.remember_identity(self.summoner_api.get_summoner_by_name(value))
+        except Exception as e:
+            logger.warning(f"⚠️ 查询召唤师信息失败 ({kind}={value}): {e}", exc_info=True)
+            return None
+
+    def _resolve_pending(self, pending, apply, on_resolved=None, is_done=None):
+        """
+        相同的查询只发一次，在有限线程池中并发执行，按完成顺序写回参与者。
+
+        返回查询失败的 (participant, lookup)；给出 is_done 时，写回后 is_done(participant) 为假的也算失败。
+        """
+        by_lookup = {}
+        for p, lookup in pending:
+            by_lookup.setdefault(lookup, []).append(p)
+        failed = []
+
+        def _deliver(lookup, info):
+            if not info:
+                failed.extend((p, lookup) for p in by_lookup[lookup])
+                return
+            for p in by_lookup[lookup]:
+                apply(p, info)
+                if is_done and not is_done(p):
+                    failed.append((p, lookup))
+                elif on_resolved:
+                    on_resolved(p)
+
+        if len(by_lookup) == 1:
+            lookup = next(iter(by_lookup))
+            _deliver(lookup, self._resolve(lookup))
+            return failed
+
+        with ThreadPoolExecutor(max_workers=min(ENRICH_WORKERS, len(by_lookup))) as pool:
+            futures = {pool.submit(self._resolve, lookup): lookup for lookup in by_lookup}
+            for future in as_completed(futures):
+                _deliver(futures[future], future.result())
+        return failed
+
+    @staticmethod
+    def _apply_identity(p, info):
+        """用身份信息补齐参与者缺失的字段，不覆盖对局数据中已有的值。"""
+        if not p.get('summonerName'):
+            name = _riot_id(info.get('gameName'), info.get('tagLine')) if info.get('gameName') else info.get('displayName')
+            if name:
+                p['summonerName'] = name
+
+        if p.get('profileIcon') is None and info.get('profileIconId') is not None:
+            p['profileIcon'] = info.get('profileIconId')
+
+        if info.get('puuid') and not p.get('puuid'):
+            p['puuid'] = info.get('puuid')
 
     def enrich_tft_game_with_summoner_info(self, game):
         if not game or not isinstance(game, dict):
@@ -91,45 +205,53 @@ class EnrichmentService:
 
         participants = game_json.get('participants') or []
 
+        pending = []
         for p in participants:
             try:
                 if not p.get('summonerName'):
                     rn = p.get('riotIdGameName') or p.get('riotId') or None
                     rt = p.get('riotIdTagline') or p.get('riotTagLine') or ''
                     if rn:
-                        p['summonerName'] = f"{rn}#{rt}" if rt else rn
-
-                info = None
+                        p['summonerName'] = _riot_id(rn, rt)
 
                 puuid = p.get('puuid') or (p.get('player') or {}).get('puuid')
-                if puuid:
-                    info = self.summoner_api.get_summoner_by_puuid(puuid)
+                if not puuid:
+                    continue
 
-                if info and isinstance(info, dict):
-                    game_name = info.get('gameName') or info.get('displayName') or info.get('summonerName') or ''
-                    tag_line = info.get('tagLine') or info.get('tagline') or ''
-
-                    if game_name:
-                        p['summonerName'] = f"{game_name}#{tag_line}" if tag_line else game_name
-                        p['riotIdGameName'] = game_name
-                        p['riotIdTagline'] = tag_line
-
-                    if 'profileIconId' in info and info.get('profileIconId') is not None:
-                        p['profileIcon'] = info.get('profileIconId')
-                    elif 'profileIcon' in info and info.get('profileIcon') is not None:
-                        p['profileIcon'] = info.get('profileIcon')
-
-                    if 'puuid' in info and info.get('puuid'):
-                        p['puuid'] = info.get('puuid')
+                info = self.summoner_api.get_cached_identity(puuid)
+                if info:
+                    self._apply_tft_identity(p, info)
+                else:
+                    pending.append((p, ('puuid', puuid)))
 
             except Exception as e:
                 print(f"[TFT] enrich参与者信息失败: {e}")
                 continue
 
+        if pending:
+            self._resolve_pending(pending, self._apply_tft_identity)
+
         return game
 
+    @staticmethod
+    def _apply_tft_identity(p, info):
+        game_name = info.get('gameName') or info.get('displayName') or ''
+        tag_line = info.get('tagLine') or ''
+
+        if game_name:
+            p['summonerName'] = _riot_id(game_name, tag_line)
+            p['riotIdGameName'] = game_name
+            p['riotIdTagline'] = tag_line
+
+        if info.get('profileIconId') is not None:
+            p['profileIcon'] = info.get('profileIconId')
+
+        if info.get('puuid'):
+            p['puuid'] = info.get('puuid')
+
 
 def enrich_game_with_augments(game):
+    """单次遍历为斗魂竞技场 / 海克斯大乱斗对局写入海克斯图标、名称与描述。"""
     if not game or not isinstance(game, dict):
         return game
 
@@ -138,46 +260,24 @@ def enrich_game_with_augments(game):
         return game
 
     participants = game.get('participants') or []
+    table = get_augment_table()
+    # 斗魂竞技场的海克斯在资源表中偏移 1000
+    offset = 1000 if game_mode == 'CHERRY' else 0
 
     for p in participants:
         try:
             stats = p.get('stats') or {}
 
-            for i in range(1, 7):
-                augment_key = f'playerAugment{i}'
-                icon_key = f'augmentIcon{i}'
-                name_key = f'augmentName{i}'
-                desc_key = f'augmentDesc{i}'
-
+            for augment_key, icon_key, name_key, desc_key in AUGMENT_SLOTS:
                 augment_id = stats.get(augment_key)
 
                 if augment_id and augment_id > 0:
-                    mapped_id = augment_id + 1000 if game_mode == 'CHERRY' else augment_id
-
-                    icon_url = get_augment_icon_url(mapped_id)
-                    stats[icon_key] = icon_url
-
-                    aug_info_map = get_augment_info()
-                    aug = {}
-                    if isinstance(aug_info_map, dict):
-                        for k, v in aug_info_map.items():
-                            try:
-                                if k == mapped_id or str(k) == str(mapped_id):
-                                    aug = v or {}
-                                    break
-                            except Exception:
-                                continue
-
-                    if aug and isinstance(aug, dict):
-                        stats[name_key] = aug.get('name', '') or aug.get('title', '')
-                        stats[desc_key] = aug.get('desc', '') or aug.get('description', '')
-                    else:
-                        stats[name_key] = None
-                        stats[desc_key] = None
+                    icon, name, desc = table.get(augment_id + offset, _MISSING_AUGMENT)
                 else:
-                    stats[icon_key] = None
-                    stats[name_key] = None
-                    stats[desc_key] = None
+                    icon, name, desc = _MISSING_AUGMENT
+                stats[icon_key] = icon
+                stats[name_key] = name
+                stats[desc_key] = desc
 
         except Exception as e:
             print(f"enrich augment信息失败: {e}")
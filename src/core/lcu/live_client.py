@@ -1,33 +1,122 @@
 """
 Live client data helpers（面向对象）。
 """
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
 import requests
 import urllib3
+from requests.adapters import HTTPAdapter
 
+from utils.game_data_formatter import format_game_data
 from utils.logger import logger
+from .live_events import LiveEventStream
 
 urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
 
 
+LIVE_CLIENT_BASE_URL = "https://127.0.0.1:2999"
+# 同一轮询周期内的多个调用方共享一次 allgamedata 拉取（秒）
+LIVE_DATA_TTL = 1.0
+# 并发解析玩家 puuid 的最大线程数
+PUUID_RESOLVE_WORKERS = 5
+
+
+class _LiveSnapshot:
+    __slots__ = ('data', 'fetched_at', 'formatted')
+
+    def __init__(self, data):
+        self.fetched_at = time.monotonic()
+        self.data = data
+        self.formatted = None
+
+
 class LiveClientAPI:
     def __init__(self, summoner_api):
         self.summoner_api = summoner_api
 
-    @staticmethod
-    def _fetch_liveclient_json(path, timeout=2.5):
-        url = f"https://127.0.0.1:2999{path}"
+        # 游戏内 2999 端口的 keep-alive Session，避免每次轮询重新建立 TLS 连接
+        self.session = requests.Session()
+        self.session.verify = False
+        self.session.mount(LIVE_CLIENT_BASE_URL, HTTPAdapter(pool_connections=1, pool_maxsize=4))
+
+        self._snapshot = None
+        self._snapshot_lock = threading.Lock()
+        # 对局事件游标（击杀播报等），只处理新增事件
+        self.events = LiveEventStream()
+        # 本局 名称 -> puuid，整局复用，新流程开始时清空
+        self._puuids = {}
+        self._puuids_lock = threading.Lock()
+
+    def _fetch_liveclient_json(self, path, timeout=2.5):
+        url = f"{LIVE_CLIENT_BASE_URL}{path}"
         try:
-            response = requests.get(url, timeout=timeout, verify=False)
+            response = self.session.get(url, timeout=timeout)
             response.raise_for_status()
             return response.json()
-        except requests.exceptions.RequestException:
+        except (requests.exceptions.RequestException, ValueError):
             return None
 
-    def _resolve_puuid(self, player):
+    def get_all_game_data(self, max_age=LIVE_DATA_TTL):
+        """
+        获取 /liveclientdata/allgamedata。
+
+        max_age 秒内的重复调用直接复用上一次的快照；并发调用在锁上等待同一次请求，
+        不会同时向游戏客户端发起多次拉取。返回的数据是共享的，调用方不应修改。
+        """
+        with self._snapshot_lock:
+            snapshot = self._snapshot
+            if snapshot is not None and time.monotonic() - snapshot.fetched_at < max_age:
+                return snapshot.data
+
+            data = self._fetch_liveclient_json("/liveclientdata/allgamedata")
+            if isinstance(data, dict):
+                self._snapshot = _LiveSnapshot(data)
+                return data
+
+            # 拉取失败可能只是暂时超时，保留事件游标；新对局由游戏流程切换（reset_live_events）
+            # 或 LiveEventStream.ingest 检测到 EventID 回退时重置
+            self._snapshot = None
+            return None
+
+    def get_live_game(self, max_age=LIVE_DATA_TTL):
+        """返回 format_game_data 格式化后的实时对局，格式化结果随快照缓存；不在游戏中时返回 None。"""
+        data = self.get_all_game_data(max_age)
+        if not data:
+            return None
+
+        with self._snapshot_lock:
+            snapshot = self._snapshot
+            if snapshot is not None and snapshot.data is data and snapshot.formatted is not None:
+                return snapshot.formatted
+
+        events_data = data.get("events")
+        self.events.ingest(events_data.get("Events") if isinstance(events_data, dict) else None)
+        formatted = format_game_data(data, recent_kills=self.events.recent_kills())
+        with self._snapshot_lock:
+            if self._snapshot is not None and self._snapshot.data is data:
+                self._snapshot.formatted = formatted
+        return formatted
+
+    def poll_events(self):
+        """
+        通过 /liveclientdata/eventdata?eventID= 只拉取游标之后的新事件。
+
+        Returns:
+            list | None: 新增事件；不在游戏中时返回 None
+        """
+        data = self._fetch_liveclient_json(f"/liveclientdata/eventdata?eventID={self.events.next_event_id}")
+        if not isinstance(data, dict):
+            return None
+        return self.events.ingest(data.get("Events"))
+
+    @staticmethod
+    def _name_candidates(player):
         candidates = []
         riot_id = player.get("riotId")
         game_name = player.get("riotIdGameName") or player.get("gameName")
-        tag_line = player.get("riotIdTagLine") or ""
+        tag_line = player.get("riotIdTagLine") or player.get("tagLine") or ""
         summoner_name = player.get("summonerName")
 
         if riot_id:
@@ -36,8 +125,36 @@ class LiveClientAPI:
             candidates.append(f"{game_name}#{tag_line}")
         if summoner_name:
             candidates.append(summoner_name)
-
+        # riotId 与 gameName#tagLine 通常相同，去重避免重复查询
+        return list(dict.fromkeys(candidates))
+
+    def seed_puuids(self, players):
+        """用已知 puuid 的玩家（如选人阶段的 myTeam）预先登记本局的 名称 -> puuid。"""
+        with self._puuids_lock:
+            for player in players or []:
+                if isinstance(player, dict) and player.get("puuid"):
+                    for name in self._name_candidates(player):
+                        self._puuids[name] = player["puuid"]
+
+    def reset_puuids(self):
+        """新的游戏流程开始时清空本局登记的 puuid。"""
+        with self._puuids_lock:
+            self._puuids.clear()
+
+    def _known_puuid(self, candidates):
+        """只查本局登记与召唤师缓存，不发起请求。"""
+        with self._puuids_lock:
+            for name in candidates:
+                if name in self._puuids:
+                    return self._puuids[name]
         for name in candidates:
+            puuid = self.summoner_api.get_cached_puuid(name)
+            if puuid:
+                return puuid
+        return None
+
+    def _resolve_puuid(self, player):
+        for name in self._name_candidates(player):
             try:
                 puuid = self.summoner_api.get_puuid(name)
                 if puuid:
@@ -47,28 +164,57 @@ class LiveClientAPI:
                 continue
         return None
 
+    def _resolve_puuids(self, players):
+        """
+        返回与 players 一一对应的 puuid 列表（无法解析的为 None）。
+
+        先查本局登记与缓存，只对剩余玩家在有限线程池中并发查询；解析结果登记到本局，
+        之后的重试与轮询不再重复查询。
+        """
+        candidates = [self._name_candidates(player) for player in players]
+        puuids = [self._known_puuid(names) for names in candidates]
+
+        pending = [i for i, puuid in enumerate(puuids) if not puuid]
+        if len(pending) == 1:
+            puuids[pending[0]] = self._resolve_puuid(players[pending[0]])
+        elif pending:
+            with ThreadPoolExecutor(max_workers=min(PUUID_RESOLVE_WORKERS, len(pending))) as pool:
+                for i, puuid in zip(pending, pool.map(lambda i: self._resolve_puuid(players[i]), pending)):
+                    puuids[i] = puuid
+
+        with self._puuids_lock:
+            for names, puuid in zip(candidates, puuids):
+                if puuid:
+                    for name in names:
+                        self._puuids[name] = puuid
+        return puuids
+
     def get_all_players_from_game(self):
-        active_player = self._fetch_liveclient_json("/liveclientdata/activeplayer")
-        player_list = self._fetch_liveclient_json("/liveclientdata/playerlist")
+        all_game_data = self.get_all_game_data()
+        if not all_game_data:
+            return None
+
+        active_player = all_game_data.get("activePlayer")
+        if not isinstance(active_player, dict):
+            active_player = None
+        player_list = all_game_data.get("allPlayers")
 
-        if not player_list:
+        if not player_list or not isinstance(player_list, list):
             return None
 
         active_team = (active_player or {}).get("team")
         active_name = (active_player or {}).get("summonerName")
 
-        entries = []
-        for player in player_list:
-            if not isinstance(player, dict):
-                continue
+        players = [player for player in player_list if isinstance(player, dict)]
+        puuids = self._resolve_puuids(players)
 
+        entries = []
+        for player, puuid in zip(players, puuids):
             team = player.get("team")
             game_name = player.get("riotIdGameName") or player.get("gameName") or player.get("riotId")
             tag_line = player.get("riotIdTagLine") or ""
             display_name = player.get("summonerName") or game_name or "Unknown"
 
-            puuid = self._resolve_puuid(player)
-
             entry = {
                 "summonerName": display_name,
                 "gameName": game_name or display_name,
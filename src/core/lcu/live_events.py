@@ -0,0 +1,72 @@
+"""
+实时对局事件游标
+记录已处理的最大 EventID，每次只处理更新的事件并追加到固定长度的环形缓冲区，
+单次处理的开销只与新增事件数有关，与对局已进行的时长无关。
+"""
+import threading
+from collections import deque
+
+from utils.game_data_formatter import format_kill_event
+
+
+EVENT_BUFFER_SIZE = 200
+RECENT_KILLS = 10
+
+
+class LiveEventStream:
+    def __init__(self, maxlen=EVENT_BUFFER_SIZE, kills=RECENT_KILLS):
+        self.next_event_id = 0
+        self._events = deque(maxlen=maxlen)
+        # 最近击杀（已格式化，最旧在前）
+        self._kills = deque(maxlen=kills)
+        self._lock = threading.Lock()
+
+    def reset(self):
+        with self._lock:
+            self._reset()
+
+    def _reset(self):
+        self.next_event_id = 0
+        self._events.clear()
+        self._kills.clear()
+
+    def ingest(self, events):
+        """
+        处理一批事件（allgamedata 的完整 Events 数组或 eventdata 的增量结果均可），返回新增事件列表。
+
+        EventID 单调递增，从数组末尾向前找到游标位置即可，不会重新扫描已处理的部分；
+        末尾 EventID 小于游标时视为进入了新对局，游标归零后重新处理。
+        """
+        if not isinstance(events, list) or not events:
+            return []
+
+        with self._lock:
+            last = events[-1] if isinstance(events[-1], dict) else {}
+            if last.get('EventID', -1) < self.next_event_id - 1:
+                self._reset()
+
+            start = len(events)
+            while start > 0:
+                event = events[start - 1]
+                if not isinstance(event, dict) or event.get('EventID', -1) < self.next_event_id:
+                    break
+                start -= 1
+
+            new_events = [e for e in events[start:] if isinstance(e, dict)]
+            for event in new_events:
+                self._events.append(event)
+                if event.get('EventName') == 'ChampionKill':
+                    self._kills.append(format_kill_event(event))
+            if new_events:
+                self.next_event_id = new_events[-1].get('EventID', self.next_event_id - 1) + 1
+            return new_events
+
+    def since(self, event_id):
+        """返回缓冲区中 EventID >= event_id 的事件（超出缓冲区的更早事件已丢弃）。"""
+        with self._lock:
+            return [e for e in self._events if e.get('EventID', -1) >= event_id]
+
+    def recent_kills(self):
+        """最近击杀，最新在前（与 format_game_data 的 recentKills 一致）。"""
+        with self._lock:
+            return list(reversed(self._kills))
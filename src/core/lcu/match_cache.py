@@ -0,0 +1,327 @@
+"""
+战绩缓存模块
+- MatchCache: 按近似字节数记账、按内存预算淘汰的 LRU 缓存，附带命中率统计
+- MatchDetailCache: 对局详情的内存 LRU + 压缩磁盘两级缓存（core.store.codec 编码）
+"""
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import Sequence
+
+from core.store import codec
+from utils.logger import logger
+
+
+CACHE_TTL = 300
+MAX_CACHE_BYTES = 32 * 1024 * 1024
+MAX_DETAIL_ITEMS = 64
+
+
+def estimate_size(value):
+    """以紧凑 JSON 长度近似估算缓存值占用的字节数。"""
+    try:
+        return len(json.dumps(value, ensure_ascii=False, separators=(',', ':'), default=str))
+    except (TypeError, ValueError):
+        return 0
+
+
+class SliceView(Sequence):
+    """完整列表上的只读切片视图，不复制底层元素。stale 标记数据是否来自过期缓存。"""
+
+    __slots__ = ('_base', '_start', '_stop', 'stale')
+
+    def __init__(self, base, start, stop, stale=False):
+        self._base = base
+        self._start = max(0, min(start, len(base)))
+        self._stop = max(self._start, min(stop, len(base)))
+        self.stale = stale
+
+    def __len__(self):
+        return self._stop - self._start
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self._base[self._start + i] for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if index < 0 or index >= len(self):
+            raise IndexError('SliceView index out of range')
+        return self._base[self._start + index]
+
+    def __iter__(self):
+        for i in range(self._start, self._stop):
+            yield self._base[i]
+
+    def __repr__(self):
+        return f"SliceView([{self._start}:{self._stop}] of {len(self._base)})"
+
+
+class MatchCache:
+    """
+    带 TTL 的字节预算 LRU 缓存（线程安全）。
+
+    超过 ttl 的条目视为过期；若设置了更长的 stale_ttl，过期条目在该时间窗内仍保留，
+    可通过 lookup() 以“陈旧”状态取出（stale-while-revalidate）。
+    """
+
+    def __init__(self, max_bytes=MAX_CACHE_BYTES, ttl=CACHE_TTL, stale_ttl=None):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.stale_ttl = max(stale_ttl or ttl, ttl)
+        self._entries = OrderedDict()  # key -> (timestamp, value, size)
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key):
+        """命中则返回缓存值并刷新 LRU 顺序；过期或不存在返回 None。"""
+        value, _ = self._lookup(key, allow_stale=False)
+        return value
+
+    def lookup(self, key):
+        """返回 (value, stale)。未命中为 (None, False)；过期但仍在陈旧窗口内为 (value, True)。"""
+        return self._lookup(key, allow_stale=True)
+
+    def _lookup(self, key, allow_stale):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None, False
+
+            cached_time, value, _ = entry
+            age = time.time() - cached_time
+            if age >= self.stale_ttl:
+                self._remove(key)
+                self.misses += 1
+                return None, False
+            if age >= self.ttl and not allow_stale:
+                self.misses += 1
+                return None, False
+
+            self._entries.move_to_end(key)
+            if age >= self.ttl:
+                self.stale_hits += 1
+                return value, True
+
+            self.hits += 1
+            return value, False
+
+    def put(self, key, value, size=None):
+        """写入缓存；size 缺省时按 JSON 长度估算，写入后按预算淘汰最久未用条目。"""
+        if size is None:
+            size = estimate_size(value)
+
+        with self._lock:
+            self._remove(key)
+            if size > self.max_bytes:
+                return
+            self._entries[key] = (time.time(), value, size)
+            self._bytes += size
+            self._evict()
+
+    def pop(self, key):
+        with self._lock:
+            entry = self._remove(key)
+            return entry[1] if entry else None
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def __contains__(self, key):
+        return key in self._entries
+
+    def __len__(self):
+        return len(self._entries)
+
+    def stats(self):
+        """返回命中、未命中与容量统计。"""
+        with self._lock:
+            lookups = self.hits + self.stale_hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'stale_hits': self.stale_hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_rate': round((self.hits + self.stale_hits) / lookups, 3) if lookups else 0.0,
+            }
+
+    def _remove(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._bytes -= entry[2]
+        return entry
+
+    def _evict(self):
+        current_time = time.time()
+        expired_keys = [k for k, (t, _, _) in self._entries.items() if current_time - t >= self.stale_ttl]
+        for k in expired_keys:
+            self._remove(k)
+
+        while self._bytes > self.max_bytes and self._entries:
+            key = next(iter(self._entries))
+            self._remove(key)
+            self.evictions += 1
+
+
+class MatchDetailCache:
+    """
+    对局详情两级缓存（按 gameId）。
+
+    已结束的对局不可变，因此磁盘层永不过期；内存层只按条目数做 LRU 淘汰。
+    put(..., persist=False) 的条目（例如补全未完成）只进入内存层并标记为不完整，下次请求时可重试。
+    磁盘读写失败不影响主流程，仅退化为内存缓存。
+    encode/decode 用于在内存对象与可 JSON 序列化的磁盘格式之间转换。
+    """
+
+    def __init__(self, cache_dir, namespace='matches', max_items=MAX_DETAIL_ITEMS, encode=None, decode=None):
+        self.max_items = max_items
+        self._encode = encode
+        self._decode = decode
+        self._dir = os.path.join(cache_dir, namespace) if cache_dir else None
+        self._memory = OrderedDict()
+        self._partial = set()
+        self._lock = threading.Lock()
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.disk_writes = 0
+
+    def _path(self, key):
+        """key 只允许纯数字（gameId），防止拼出缓存目录之外的路径。"""
+        if not (key.isascii() and key.isdigit()):
+            raise ValueError(f"invalid cache key: {key!r}")
+        return os.path.join(self._dir, f"{key}.json.z")
+
+    def get(self, game_id):
+        key = str(game_id)
+        with self._lock:
+            value = self._memory.get(key)
+            if value is not None:
+                self._memory.move_to_end(key)
+                self.memory_hits += 1
+                return value
+
+        value = self._read_disk(key)
+        if value is None:
+            self.misses += 1
+            return None
+
+        self.disk_hits += 1
+        self._remember(key, value)
+        return value
+
+    def put(self, game_id, value, persist=True):
+        key = str(game_id)
+        self._remember(key, value)
+        with self._lock:
+            if persist:
+                self._partial.discard(key)
+            else:
+                self._partial.add(key)
+        if persist:
+            self._write_disk(key, value)
+
+    def invalidate(self, game_id):
+        """移除条目（内存层与磁盘文件），用于作废以降级状态写入的缓存。"""
+        key = str(game_id)
+        with self._lock:
+            self._memory.pop(key, None)
+            self._partial.discard(key)
+        if not self._dir:
+            return
+        try:
+            os.remove(self._path(key))
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError) as exc:
+            logger.warning(f"⚠️ 删除对局磁盘缓存失败 ({key}): {exc}")
+
+    def is_partial(self, game_id):
+        """条目是否只存在于内存层（未写入磁盘，需要重试补全）。"""
+        with self._lock:
+            return str(game_id) in self._partial
+
+    def __contains__(self, game_id):
+        key = str(game_id)
+        if key in self._memory:
+            return True
+        try:
+            return bool(self._dir) and os.path.exists(self._path(key))
+        except ValueError:
+            return False
+
+    def iter_disk(self, exclude=()):
+        """遍历磁盘层的全部条目 (key, value)，跳过 exclude 中的 key；不进入内存层也不计入统计。"""
+        if not self._dir or not os.path.isdir(self._dir):
+            return
+        for filename in os.listdir(self._dir):
+            if not filename.endswith('.json.z'):
+                continue
+            key = filename[:-len('.json.z')]
+            if key in exclude or not key.isdigit():
+                continue
+            value = self._read_disk(key)
+            if value is not None:
+                yield key, value
+
+    def stats(self):
+        lookups = self.memory_hits + self.disk_hits + self.misses
+        return {
+            'memory_entries': len(self._memory),
+            'max_items': self.max_items,
+            'memory_hits': self.memory_hits,
+            'disk_hits': self.disk_hits,
+            'misses': self.misses,
+            'disk_writes': self.disk_writes,
+            'hit_rate': round((self.memory_hits + self.disk_hits) / lookups, 3) if lookups else 0.0,
+        }
+
+    def _remember(self, key, value):
+        with self._lock:
+            self._memory[key] = value
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.max_items:
+                evicted, _ = self._memory.popitem(last=False)
+                self._partial.discard(evicted)
+
+    def _read_disk(self, key):
+        if not self._dir:
+            return None
+        try:
+            path = self._path(key)
+            if not os.path.exists(path):
+                return None
+            with open(path, 'rb') as f:
+                value = codec.decode(f.read())
+            return self._decode(value) if self._decode else value
+        except (OSError, ValueError) as exc:
+            logger.warning(f"⚠️ 读取对局磁盘缓存失败 ({key}): {exc}")
+            return None
+
+    def _write_disk(self, key, value):
+        if not self._dir:
+            return
+        try:
+            path = self._path(key)
+            tmp_path = f"{path}.tmp"
+            os.makedirs(self._dir, exist_ok=True)
+            if self._encode:
+                value = self._encode(value)
+            data = codec.encode(value)
+            with open(tmp_path, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+            self.disk_writes += 1
+        except (OSError, TypeError, ValueError) as exc:
+            logger.warning(f"⚠️ 写入对局磁盘缓存失败 ({key}): {exc}")
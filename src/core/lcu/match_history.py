@@ -1,147 +1,279 @@
 """
 战绩查询 API（面向对象）
 """
+import threading
 import time
+from collections import OrderedDict
 import requests
 from urllib.parse import quote_plus
 from utils.logger import logger
 
+from core.store.records import MatchSummary
+from core.store.summary_store import summary_store
+from core.store.timeline import MatchTimeline
+from core.store.tft_index import tft_index
+from .match_cache import CACHE_TTL, MatchCache, MatchDetailCache, SliceView, estimate_size
 
-CACHE_TTL = 300
-MAX_CACHE_SIZE = 100
 
+# 过期后仍可作为“陈旧数据”立即返回的时间窗
+STALE_TTL = 3600
+# TFT 战绩单独的字节预算（不提供陈旧读取，过期即淘汰）
+MAX_TFT_CACHE_BYTES = 8 * 1024 * 1024
+# 位置 -> gameId 索引最多保留的 puuid 数
+MAX_INDEXED_PUUIDS = 200
 
-class MatchHistoryAPI:
-    def __init__(self, client):
-        self.client = client
-        self._cache = {}
-
-    def _clean_cache(self):
-        current_time = time.time()
-        expired_keys = [k for k, (t, _) in self._cache.items() if current_time - t > CACHE_TTL]
-        for k in expired_keys:
-            self._cache.pop(k, None)
+# 后台刷新发现新对局时的回调：callback(puuid, records)
+_history_listeners = []
 
-        if len(self._cache) > MAX_CACHE_SIZE:
-            sorted_items = sorted(self._cache.items(), key=lambda x: x[1][0])
-            for k, _ in sorted_items[:len(self._cache) - MAX_CACHE_SIZE]:
-                self._cache.pop(k, None)
-
-    def get_match_history(self, puuid, count=20, begin_index=0):
-        self._clean_cache()
 
-        full_cache_key = f"{puuid}_full"
-        sliced_cache_key = f"{puuid}_{begin_index}_{count}"
+def add_history_listener(callback):
+    """注册战绩刷新回调（例如通过 Socket.IO 推送给订阅的页面）。"""
+    if callback not in _history_listeners:
+        _history_listeners.append(callback)
 
-        if sliced_cache_key in self._cache:
-            cached_time, cached_data = self._cache[sliced_cache_key]
-            if time.time() - cached_time < CACHE_TTL:
-                logger.debug(f"✅ 使用切片缓存 (begin={begin_index}, count={count})")
-                return cached_data
 
-        all_games = None
-        if full_cache_key in self._cache:
-            cached_time, cached_games = self._cache[full_cache_key]
-            if time.time() - cached_time < CACHE_TTL:
-                logger.debug(f"✅ 使用完整数据缓存 (共 {len(cached_games)} 场)")
-                all_games = cached_games
-
-        if all_games is None:
-            endpoint = f"/lol-match-history/v1/products/lol/{quote_plus(puuid)}/matches"
-            attempt_profiles = [
-                {
-                    'endIndex': min(max(count, 20), 30),
-                    'timeout': 12,
-                    'desc': 'baseline'
-                },
-                {
-                    'endIndex': min(max(count + 10, 30), 50),
-                    'timeout': 18,
-                    'desc': 'expanded'
-                }
-            ]
-
-            for idx, profile in enumerate(attempt_profiles):
-                params = {'begIndex': 0, 'endIndex': profile['endIndex']}
-                timeout = profile['timeout']
-                logger.debug(f"📊 请求 {profile['endIndex']} 场历史记录 (profile={profile['desc']}, timeout={timeout}s)...")
-
-                result = self.client.request(
-                    "GET",
-                    endpoint,
-                    params=params,
-                    timeout=timeout
-                )
-
-                if not result:
-                    direct_timeout = min(timeout + 6, 28)
-                    url = f"{self.client.base_url}{endpoint}"
-                    try:
-                        logger.warning(f"⏳ 统一请求无响应，尝试直接请求 (timeout={direct_timeout}s)...")
-                        resp = self.client.session.get(
-                            url,
-                            params=params,
-                            timeout=direct_timeout,
-                            verify=False
-                        )
-                        resp.raise_for_status()
-                        result = resp.json()
-                    except requests.RequestException as exc:
-                        logger.warning(f"⚠️ 直接请求失败: {exc}")
-                        if idx == len(attempt_profiles) - 1:
-                            logger.error(f"❌ 查询最终失败 (PUUID={puuid[:8]}...)")
-                            return None
-                        logger.debug("⏱️ 等待 1 秒后尝试下一套配置...")
-                        time.sleep(1)
-                        continue
+class MatchHistoryAPI:
+    def __init__(self, client, cache_dir=None):
+        self.client = client
+        self._cache = MatchCache(ttl=CACHE_TTL, stale_ttl=STALE_TTL)
+        self._tft_cache = MatchCache(max_bytes=MAX_TFT_CACHE_BYTES, ttl=CACHE_TTL)
+        self._refreshing = set()
+        self._refresh_lock = threading.Lock()
+        # puuid -> 按历史顺序排列的 gameId，独立于战绩缓存的淘汰
+        self._game_index = OrderedDict()
+        # 时间线只在对局结束后存在且不可变，永久缓存
+        self._timelines = MatchDetailCache(
+            cache_dir,
+            namespace='timelines',
+            encode=MatchTimeline.to_dict,
+            decode=MatchTimeline.from_dict
+        )
+
+    def cache_stats(self):
+        """返回战绩缓存的命中率与内存占用统计。"""
+        return dict(self._cache.stats(), tft=self._tft_cache.stats())
+
+    def resolve_game_id(self, puuid, index):
+        """由历史列表中的位置直接得到 gameId；尚未索引或越界时返回 None。"""
+        game_ids = self._game_index.get(puuid)
+        if game_ids is None or index < 0 or index >= len(game_ids):
+            return None
+        return game_ids[index]
+
+    def _update_game_index(self, puuid, records):
+        self._game_index[puuid] = tuple(record.game_id for record in records)
+        self._game_index.move_to_end(puuid)
+        while len(self._game_index) > MAX_INDEXED_PUUIDS:
+            self._game_index.popitem(last=False)
+
+    def get_match_summaries(self, puuid, count=20, begin_index=0):
+        """
+        返回紧凑摘要记录的切片视图，不解码原始对局 JSON。
+
+        缓存过期时立即返回旧数据（sliced.stale 为 True），同时在后台刷新。
+        """
+        records, stale = self._get_summary_records(puuid, count)
+        if records is None:
+            return None
+
+        # 切片只是完整列表上的视图，不再单独缓存一份副本
+        sliced = SliceView(records, begin_index, begin_index + count, stale=stale)
+
+        logger.debug(f"📊 从 {len(records)} 场中切片，取第 {begin_index+1}-{begin_index+len(sliced)} 场")
+        if sliced:
+            logger.debug(f"   第一场: gameId={sliced[0].game_id}")
+            if len(sliced) > 1:
+                logger.debug(f"   最后一场: gameId={sliced[-1].game_id}")
+
+        logger.debug(f"✅ 返回 {len(sliced)} 场比赛")
+        return sliced
 
-                if result:
-                    games_data = result.get('games', {})
-                    if isinstance(games_data, dict):
-                        all_games = games_data.get('games', [])
-                    else:
-                        all_games = games_data if isinstance(games_data, list) else []
+    def get_match_history(self, puuid, count=20, begin_index=0):
+        """返回原始结构的战绩（按需从压缩缓存解码），仅在需要完整字段时使用。"""
+        sliced = self.get_match_summaries(puuid, count=count, begin_index=begin_index)
+        if sliced is None:
+            return None
 
-                    logger.debug(f"✅ API返回 {len(all_games)} 场历史记录 (profile={profile['desc']})")
+        return {
+            'games': {
+                'games': [record.raw for record in sliced]
+            }
+        }
 
-                    self._cache[full_cache_key] = (time.time(), all_games)
-                    break
+    def _get_summary_records(self, puuid, count):
+        records, stale = self._cache.lookup(f"{puuid}_full")
+        if records is not None:
+            if stale:
+                logger.debug(f"♻️ 返回过期战绩缓存并后台刷新 (PUUID={puuid[:8]}...)")
+                self._schedule_refresh(puuid, count, records)
+            else:
+                logger.debug(f"✅ 使用完整数据缓存 (共 {len(records)} 场)")
+            return records, stale
 
-            if all_games is None:
-                return None
+        return self._load_summary_records(puuid, count), False
 
-        sliced_games = all_games[begin_index:begin_index + count]
+    def _load_summary_records(self, puuid, count):
+        all_games = self._fetch_history_games(puuid, count)
+        if all_games is None:
+            return None
+
+        records = [MatchSummary.from_game(game, puuid) for game in all_games if isinstance(game, dict)]
+        self._cache.put(f"{puuid}_full", records, size=sum(r.approx_size() for r in records))
+        self._update_game_index(puuid, records)
+        # 累积到本地战绩库，供过滤查询使用
+        summary_store.ingest(puuid, records)
+        return records
+
+    def _schedule_refresh(self, puuid, count, previous):
+        with self._refresh_lock:
+            if puuid in self._refreshing:
+                return
+            self._refreshing.add(puuid)
+
+        threading.Thread(
+            target=self._refresh_history,
+            args=(puuid, count, previous),
+            daemon=True
+        ).start()
+
+    def _refresh_history(self, puuid, count, previous):
+        """后台刷新单个 puuid 的战绩；出现新对局时通知监听者。"""
+        try:
+            records = self._load_summary_records(puuid, count)
+            if records is None:
+                return
+
+            known_ids = {record.game_id for record in previous}
+            new_count = sum(1 for record in records if record.game_id not in known_ids)
+            if not new_count:
+                return
+
+            logger.info(f"🆕 后台刷新发现 {new_count} 场新对局 (PUUID={puuid[:8]}...)")
+            for callback in _history_listeners:
+                try:
+                    callback(puuid, records)
+                except Exception as e:
+                    logger.warning(f"⚠️ 战绩刷新回调失败: {e}")
+        finally:
+            with self._refresh_lock:
+                self._refreshing.discard(puuid)
+
+    def _fetch_history_games(self, puuid, count):
+        all_games = None
+        endpoint = f"/lol-match-history/v1/products/lol/{quote_plus(puuid)}/matches"
+        attempt_profiles = [
+            {
+                'endIndex': min(max(count, 20), 30),
+                'timeout': 12,
+                'desc': 'baseline'
+            },
+            {
+                'endIndex': min(max(count + 10, 30), 50),
+                'timeout': 18,
+                'desc': 'expanded'
+            }
+        ]
 
-        logger.debug(f"📊 从 {len(all_games)} 场中切片，取第 {begin_index+1}-{begin_index+len(sliced_games)} 场")
-        if sliced_games:
-            logger.debug(f"   第一场: gameId={sliced_games[0].get('gameId', 'N/A')}")
-            if len(sliced_games) > 1:
-                logger.debug(f"   最后一场: gameId={sliced_games[-1].get('gameId', 'N/A')}")
+        for idx, profile in enumerate(attempt_profiles):
+            params = {'begIndex': 0, 'endIndex': profile['endIndex']}
+            timeout = profile['timeout']
+            logger.debug(f"📊 请求 {profile['endIndex']} 场历史记录 (profile={profile['desc']}, timeout={timeout}s)...")
+
+            result = self.client.request(
+                "GET",
+                endpoint,
+                params=params,
+                timeout=timeout
+            )
+
+            if not result:
+                direct_timeout = min(timeout + 6, 28)
+                url = f"{self.client.base_url}{endpoint}"
+                try:
+                    logger.warning(f"⏳ 统一请求无响应，尝试直接请求 (timeout={direct_timeout}s)...")
+                    resp = self.client.session.get(
+                        url,
+                        params=params,
+                        timeout=direct_timeout,
+                        verify=False
+                    )
+                    resp.raise_for_status()
+                    result = resp.json()
+                except requests.RequestException as exc:
+                    logger.warning(f"⚠️ 直接请求失败: {exc}")
+                    if idx == len(attempt_profiles) - 1:
+                        logger.error(f"❌ 查询最终失败 (PUUID={puuid[:8]}...)")
+                        return None
+                    logger.debug("⏱️ 等待 1 秒后尝试下一套配置...")
+                    time.sleep(1)
+                    continue
 
-        sliced_result = {
-            'games': {
-                'games': sliced_games
-            }
-        }
+            if result:
+                games_data = result.get('games', {})
+                if isinstance(games_data, dict):
+                    all_games = games_data.get('games', [])
+                else:
+                    all_games = games_data if isinstance(games_data, list) else []
 
-        self._cache[sliced_cache_key] = (time.time(), sliced_result)
-        logger.debug(f"✅ 返回 {len(sliced_games)} 场比赛")
+                logger.debug(f"✅ API返回 {len(all_games)} 场历史记录 (profile={profile['desc']})")
+                break
 
-        return sliced_result
+        return all_games
 
     def get_tft_match_history(self, puuid, count=20):
-        self._clean_cache()
-        cache_key = f"tft_{puuid}_{count}"
-        if cache_key in self._cache:
-            cached_time, cached_data = self._cache[cache_key]
-            if time.time() - cached_time < CACHE_TTL:
-                logger.debug(f"✅ 使用缓存数据 (TFT PUUID={puuid[:8]}..., count={count})")
-                return cached_data
+        """
+        TFT 战绩按 puuid 缓存为一条不断增长的列表。
+
+        请求数量不超过已缓存前缀（或该玩家已无更多对局）时直接切片返回；
+        否则只向 LCU 请求缺失的尾部并追加到列表中。
+        返回 {'games': {'games': [...]}}，其中是普通 list（调用方可直接 jsonify）。
+        """
+        cache_key = f"tft_{puuid}"
+        entry = self._tft_cache.get(cache_key)
+
+        if entry is not None:
+            games, requested = entry['games'], entry['requested']
+            if count <= requested or len(games) < requested:
+                logger.debug(f"✅ 使用 TFT 前缀缓存 (PUUID={puuid[:8]}..., count={count}, 已缓存 {len(games)} 场)")
+                return {'games': {'games': games[:count]}}
+
+            tail = self._fetch_tft_games(puuid, begin=len(games), count=count - len(games))
+            if tail is None:
+                return {'games': {'games': games[:count]}}
+
+            # 期间若有新对局导致偏移，按 match_id 去重
+            seen = {self._tft_match_id(g) for g in games}
+            tail = [g for g in tail if self._tft_match_id(g) not in seen]
+            games = games + tail
+            # 只估算新增尾部，已缓存前缀沿用上次的估算值
+            size = entry.get('size', 0) + estimate_size(tail)
+        else:
+            games = self._fetch_tft_games(puuid, begin=0, count=count)
+            if games is None:
+                return None
+            size = estimate_size(games)
+
+        self._tft_cache.put(cache_key, {'games': games, 'requested': count, 'size': size}, size=size)
+        # 阵容指纹索引按 match_id 去重，重复写入已索引的对局没有开销
+        tft_index.ingest(puuid, games)
+        logger.info(f"✅ TFT 查询成功 (PUUID={puuid[:8]}..., {len(games)} 场比赛)")
+        return {'games': {'games': games[:count]}}
 
+    @staticmethod
+    def _tft_match_id(game):
+        metadata = game.get('metadata') if isinstance(game, dict) else None
+        if isinstance(metadata, dict) and metadata.get('match_id'):
+            return metadata.get('match_id')
+        game_json = game.get('json') if isinstance(game, dict) else None
+        if isinstance(game_json, dict):
+            return game_json.get('game_id') or game_json.get('gameId')
+        return id(game)
+
+    def _fetch_tft_games(self, puuid, begin, count):
         timeout = min(8 + (count // 20) * 2, 25)
-        logger.debug(f"📊 查询 TFT {count} 场战绩，预计timeout={timeout}秒")
+        logger.debug(f"📊 查询 TFT 第 {begin + 1}-{begin + count} 场战绩，预计timeout={timeout}秒")
 
-        url = f"{self.client.base_url}/lol-match-history/v1/products/tft/{quote_plus(puuid)}/matches?begin=0&count={count}"
+        url = f"{self.client.base_url}/lol-match-history/v1/products/tft/{quote_plus(puuid)}/matches?begin={begin}&count={count}"
 
         max_retries = 2
         for attempt in range(max_retries):
@@ -150,13 +282,8 @@ class MatchHistoryAPI:
                 logger.debug(f"📡 TFT 请求响应: {resp.status_code}")
 
                 if resp.status_code == 200:
-                    data = resp.json()
-                    normalized = self._normalize_tft_response(data)
-                    self._cache[cache_key] = (time.time(), normalized)
-
-                    games_count = self._get_games_count(normalized)
-                    logger.info(f"✅ TFT 查询成功 (PUUID={puuid[:8]}..., {games_count} 场比赛)")
-                    return normalized
+                    normalized = self._normalize_tft_response(resp.json())
+                    return list(normalized['games']['games'])
                 else:
                     logger.warning(f"⚠️ TFT 请求失败: {resp.status_code}")
                     if attempt < max_retries - 1:
@@ -187,16 +314,6 @@ class MatchHistoryAPI:
                 return data
         return {'games': {'games': []}}
 
-    @staticmethod
-    def _get_games_count(normalized):
-        try:
-            g = normalized.get('games', {})
-            if isinstance(g, dict):
-                return len(g.get('games', []))
-        except Exception:
-            pass
-        return 0
-
     def get_match_by_id(self, match_id):
         candidates = [
             f"/lol-match-history/v1/games/{match_id}",
@@ -213,3 +330,19 @@ class MatchHistoryAPI:
 
         logger.warning(f"❌ 无法通过任何已知 LCU 端点获取 match_id={match_id}")
         return None
+
+    def get_match_timeline(self, game_id):
+        """获取对局时间线（紧凑形式，按 gameId 永久缓存）；失败返回 None。"""
+        cached = self._timelines.get(game_id)
+        if cached is not None:
+            return cached
+
+        payload = self.client.request("GET", f"/lol-match-history/v1/game-timelines/{game_id}", timeout=8)
+        timeline = MatchTimeline.from_lcu(game_id, payload)
+        if timeline is None:
+            logger.warning(f"❌ 无法获取对局时间线 (game_id={game_id})")
+            return None
+
+        self._timelines.put(game_id, timeline)
+        logger.debug(f"✅ 获取对局时间线成功 (game_id={game_id}, {len(timeline.timestamps)} 帧)")
+        return timeline
@@ -3,12 +3,17 @@
 依赖共享的 LCUClient，内部维护独立缓存。
 """
 import re
+import threading
 import time
+from collections import OrderedDict
 from utils.logger import logger
 
 
 PUUID_CACHE_TTL = 600
 MAX_PUUID_CACHE_SIZE = 200
+# 身份信息（名称/头像）变化极少，缓存时间比 PUUID 缓存更长
+IDENTITY_CACHE_TTL = 1800
+MAX_IDENTITY_CACHE_SIZE = 500
 BIDI_CONTROL_PATTERN = re.compile(r'[\u200e\u200f\u202a-\u202e\u2066-\u2069]')
 
 
@@ -16,6 +21,9 @@ class SummonerAPI:
     def __init__(self, client):
         self.client = client
         self._puuid_cache = {}
+        # puuid -> (写入时间, 身份信息)，来自对局数据或 by-puuid 查询
+        self._identity_cache = OrderedDict()
+        self._identity_lock = threading.Lock()
 
     @staticmethod
     def _sanitize_summoner_name(name):
@@ -25,7 +33,7 @@ class SummonerAPI:
         return cleaned.strip()
 
     def _clean_puuid_cache(self):
-        """清理过期和过量缓存。"""
+        """清理过期和过量缓存（调用方需持有 _identity_lock）。"""
         current_time = time.time()
         expired_keys = [k for k, (t, _) in self._puuid_cache.items() if current_time - t > PUUID_CACHE_TTL]
         for k in expired_keys:
@@ -41,17 +49,16 @@ class SummonerAPI:
 
     def get_puuid(self, summoner_name):
         """通过召唤师名字获取 PUUID，带缓存。"""
-        self._clean_puuid_cache()
-
         cleaned_name = self._sanitize_summoner_name(summoner_name)
         if not cleaned_name:
             return None
 
-        if cleaned_name in self._puuid_cache:
-            cached_time, cached_puuid = self._puuid_cache[cleaned_name]
-            if time.time() - cached_time < PUUID_CACHE_TTL:
-                logger.debug(f"✅ 使用PUUID缓存 ({cleaned_name})")
-                return cached_puuid
+        with self._identity_lock:
+            self._clean_puuid_cache()
+            entry = self._puuid_cache.get(cleaned_name)
+        if entry and time.time() - entry[0] < PUUID_CACHE_TTL:
+            logger.debug(f"✅ 使用PUUID缓存 ({cleaned_name})")
+            return entry[1]
 
         endpoint = "/lol-summoner/v1/summoners"
 
@@ -64,11 +71,23 @@ class SummonerAPI:
         if data:
             puuid = data.get('puuid')
             if puuid:
-                self._puuid_cache[cleaned_name] = (time.time(), puuid)
+                with self._identity_lock:
+                    self._puuid_cache[cleaned_name] = (time.time(), puuid)
                 logger.debug(f"✅ 查询PUUID成功 ({cleaned_name})")
             return puuid
         return None
 
+    def get_cached_puuid(self, summoner_name):
+        """只查 PUUID 缓存（包括从对局数据登记的 Riot ID），不发起请求。"""
+        cleaned_name = self._sanitize_summoner_name(summoner_name)
+        if not cleaned_name:
+            return None
+        with self._identity_lock:
+            entry = self._puuid_cache.get(cleaned_name)
+        if entry and time.time() - entry[0] < PUUID_CACHE_TTL:
+            return entry[1]
+        return None
+
     def get_summoner_by_id(self, summoner_id):
         endpoint = f"/lol-summoner/v1/summoners/{summoner_id}"
         return self.client.request("GET", endpoint)
@@ -77,6 +96,53 @@ class SummonerAPI:
         endpoint = f"/lol-summoner/v1/summoners/by-puuid/{puuid}"
         return self.client.request("GET", endpoint)
 
+    @staticmethod
+    def _to_identity(data):
+        """从召唤师接口或对局 participantIdentities.player 中提取身份字段。"""
+        if not isinstance(data, dict) or not data.get('puuid'):
+            return None
+        profile_icon = data.get('profileIconId')
+        if profile_icon is None:
+            profile_icon = data.get('profileIcon')
+        return {
+            'puuid': data.get('puuid'),
+            'gameName': data.get('gameName') or '',
+            'tagLine': data.get('tagLine') or data.get('tagline') or '',
+            'displayName': data.get('displayName') or data.get('summonerName') or '',
+            'profileIconId': profile_icon,
+            'summonerId': data.get('summonerId'),
+        }
+
+    def remember_identity(self, data):
+        """写入身份缓存，同时把 Riot ID 登记到 PUUID 缓存；返回规范化后的身份信息。"""
+        identity = self._to_identity(data)
+        if identity is None:
+            return None
+
+        now = time.time()
+        with self._identity_lock:
+            self._identity_cache[identity['puuid']] = (now, identity)
+            self._identity_cache.move_to_end(identity['puuid'])
+            while len(self._identity_cache) > MAX_IDENTITY_CACHE_SIZE:
+                self._identity_cache.popitem(last=False)
+
+            if identity['gameName'] and identity['tagLine']:
+                riot_id = f"{identity['gameName']}#{identity['tagLine']}"
+                self._puuid_cache[riot_id] = (now, identity['puuid'])
+        return identity
+
+    def get_cached_identity(self, puuid):
+        """只查缓存，不发起请求；未命中或已过期返回 None。"""
+        with self._identity_lock:
+            entry = self._identity_cache.get(puuid)
+            if entry is None:
+                return None
+            cached_time, identity = entry
+            if time.time() - cached_time > IDENTITY_CACHE_TTL:
+                self._identity_cache.pop(puuid, None)
+                return None
+            return identity
+
     def get_summoner_by_name(self, name):
         endpoint = "/lol-summoner/v1/summoners"
         cleaned_name = self._sanitize_summoner_name(name)
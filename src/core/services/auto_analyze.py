@@ -4,6 +4,7 @@
 import time
 from config import app_state
 from core import lcu
+from core.store.coplayer_index import coplayer_index
 from utils.logger import logger
 
 
@@ -58,6 +59,23 @@ def _get_player_rank_info(client, puuid):
         return {'tier': 'UNRANKED', 'division': '', 'lp': 0}
 
 
+def _annotate_shared_history(client, players):
+    """
+    为每名玩家附加与当前召唤师的历史同场记录（shared_history 字段）。
+    数据来自本地同场玩家索引，只做内存中的集合求交，不发起逐玩家的 LCU 请求。
+    """
+    # client.request 已处理网络异常，失败时返回 None
+    my_puuid = client.get_current_puuid()
+    if not my_puuid:
+        return players
+
+    for player in players:
+        puuid = player.get('puuid')
+        if puuid and puuid != my_puuid:
+            player['shared_history'] = coplayer_index.head_to_head(my_puuid, puuid)
+    return players
+
+
 def auto_analyze_task(socketio):
     """
     敌我分析的后台任务
@@ -69,6 +87,9 @@ def auto_analyze_task(socketio):
     MAX_ENEMY_RETRIES = 10
     last_phase = None
 
+    # 提前加载同场玩家索引，进入选人/游戏阶段时查询无需读盘
+    coplayer_index.load()
+
     try:
         while app_state.auto_analyze_enabled:
             if not app_state.is_lcu_connected():
@@ -87,6 +108,8 @@ def auto_analyze_task(socketio):
                 # 检测到新的游戏流程开始，重置状态
                 if last_phase in ["Lobby", "None", None] and phase not in ["Lobby", "None"]:
                     app_state.reset_analysis_state()
+                    client.reset_live_puuids()
+                    client.reset_live_events()
                     enemy_retry_count = 0
                     logger.info(f"🔄 检测到新游戏流程开始 ({last_phase} -> {phase})，重置分析状态")
 
@@ -150,6 +173,9 @@ def _analyze_teammates(client, socketio):
     """
     session = client.get_champ_select_session()
     if session:
+        # 选人阶段已知的 puuid 登记给实时数据解析，进入游戏后无需再按名称查询
+        client.seed_live_puuids((session.get('myTeam') or []) + (session.get('theirTeam') or []))
+
         teammates = []
         for team_member in session.get('myTeam', []):
             puuid = team_member.get('puuid')
@@ -167,6 +193,7 @@ def _analyze_teammates(client, socketio):
                 })
         
         if teammates:
+            _annotate_shared_history(client, teammates)
             socketio.emit('teammates_found', {'teammates': teammates})
             socketio.emit('status_update', {'type': 'biz', 'message': f'👥 发现 {len(teammates)} 名队友，开始分析战绩...'})
             app_state.teammate_analysis_done = True
@@ -199,6 +226,7 @@ def _ensure_teammates_from_live_game(client, socketio, players_data):
         })
 
     if teammates:
+        _annotate_shared_history(client, teammates)
         socketio.emit('teammates_found', {'teammates': teammates})
         socketio.emit('status_update', {'type': 'biz', 'message': f'👥 发现 {len(teammates)} 名队友，开始分析战绩...'})
         app_state.teammate_analysis_done = True
@@ -250,6 +278,7 @@ def _analyze_enemies(client, socketio, retry_count, max_retries):
                 enemy['rank'] = rank_info
         
         if len(enemies) > 0:
+            _annotate_shared_history(client, enemies)
             socketio.emit('enemies_found', {'enemies': enemies})
             socketio.emit('status_update', {'type': 'biz', 'message': f'💥 发现 {len(enemies)} 名敌人，开始分析战绩...'})
             app_state.enemy_analysis_done = True
@@ -0,0 +1,81 @@
+"""
+战绩导出服务
+把 MatchSummary 逐行转换为 NDJSON 或 CSV 文本，以生成器形式惰性输出，
+无论导出多少场，内存占用只与单行大小有关。
+"""
+import csv
+import io
+import json
+from datetime import datetime
+
+import constants
+
+
+EXPORT_FIELDS = (
+    'game_id', 'match_id', 'game_creation', 'played_at', 'duration', 'game_mode', 'queue_id',
+    'champion_id', 'champion_en', 'win', 'kills', 'deaths', 'assists', 'kda', 'gold_earned',
+    'cs', 'champion_level', 'damage', 'placement', 'augments',
+)
+
+EXPORT_FORMATS = ('ndjson', 'csv')
+
+
+def export_row(record):
+    """把一条 MatchSummary 转换为导出行（字段顺序与 EXPORT_FIELDS 一致）。"""
+    played_at = ''
+    if record.game_creation:
+        played_at = datetime.fromtimestamp(record.game_creation / 1000).isoformat(timespec='seconds')
+
+    return {
+        'game_id': record.game_id,
+        'match_id': record.match_id or record.game_id,
+        'game_creation': record.game_creation,
+        'played_at': played_at,
+        'duration': record.duration,
+        'game_mode': record.game_mode,
+        'queue_id': record.queue_id,
+        'champion_id': record.champion_id,
+        'champion_en': constants._get_champion_map().get(record.champion_id, f"Champion{record.champion_id}"),
+        'win': record.win,
+        'kills': record.kills,
+        'deaths': record.deaths,
+        'assists': record.assists,
+        'kda': record.kda,
+        'gold_earned': record.gold_earned,
+        'cs': record.cs,
+        'champion_level': record.champion_level,
+        'damage': record.damage,
+        'placement': record.placement,
+        'augments': list(record.augments),
+    }
+
+
+def iter_ndjson(records):
+    for record in records:
+        yield json.dumps(export_row(record), ensure_ascii=False, separators=(',', ':')) + '\n'
+
+
+def iter_csv(records):
+    """逐行输出 CSV；首行为表头，海克斯列表以 | 连接。"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+
+    def flush():
+        text = buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate(0)
+        return text
+
+    # 带 BOM，Excel 打开中文不乱码
+    writer.writerow(EXPORT_FIELDS)
+    yield '\ufeff' + flush()
+
+    for record in records:
+        row = export_row(record)
+        row['augments'] = '|'.join(str(a) for a in row['augments'])
+        writer.writerow([row[field] for field in EXPORT_FIELDS])
+        yield flush()
+
+
+def iter_export(records, fmt):
+    return iter_csv(records) if fmt == 'csv' else iter_ndjson(records)
@@ -0,0 +1,151 @@
+"""
+实时对局增量推送
+后台按固定周期拉取实时对局（LiveClientAPI.get_live_game），与上一帧比较后只推送变化的玩家字段；
+每 KEYFRAME_INTERVAL 帧、阵容变化以及页面（重新）订阅时发送完整关键帧，客户端以关键帧为基准应用增量。
+没有订阅者时后台线程自动退出。
+"""
+import threading
+import time
+
+from config import app_state
+from core import lcu
+from utils.logger import logger
+
+
+TICK_INTERVAL = 1.0
+KEYFRAME_INTERVAL = 10
+LIVE_GAME_ROOM = 'live_game'
+
+# 参与增量比较的玩家字段（其余字段如符文、召唤师技能整局不变，只随关键帧发送）
+DELTA_FIELDS = ('kills', 'deaths', 'assists', 'cs', 'kda', 'items', 'level', 'isDead', 'respawnTimer')
+
+_live_listeners = []
+
+
+def add_live_listener(callback):
+    """注册推送回调 callback(event, payload)（例如通过 Socket.IO 推送到 LIVE_GAME_ROOM）。"""
+    if callback not in _live_listeners:
+        _live_listeners.append(callback)
+
+
+def player_key(player):
+    return player.get('riotId') or player.get('summonerName')
+
+
+def _index_players(game):
+    return {
+        player_key(player): player
+        for side in ('teammates', 'enemies')
+        for player in (game.get(side) or [])
+        if isinstance(player, dict)
+    }
+
+
+def diff_players(previous, current):
+    """
+    比较两帧 format_game_data 输出中的玩家字段。
+
+    Returns:
+        dict | None: {玩家键: {变化字段: 新值}}；双方玩家集合不同（需要关键帧）时返回 None
+    """
+    before = _index_players(previous)
+    after = _index_players(current)
+    if before.keys() != after.keys():
+        return None
+
+    changes = {}
+    for key, player in after.items():
+        old = before[key]
+        changed = {field: player.get(field) for field in DELTA_FIELDS if player.get(field) != old.get(field)}
+        if changed:
+            changes[key] = changed
+    return changes
+
+
+class LiveGamePublisher:
+    def __init__(self, interval=TICK_INTERVAL, keyframe_interval=KEYFRAME_INTERVAL):
+        self.interval = interval
+        self.keyframe_interval = keyframe_interval
+        self._subscribers = set()
+        self._lock = threading.Lock()
+        self._thread = None
+        self._tick = 0
+        self._keyframe_tick = 0
+        self._last = None
+
+    def subscribe(self, sid):
+        """登记订阅者并确保后台线程运行；返回当前关键帧（尚无数据时为 None）。"""
+        with self._lock:
+            self._subscribers.add(sid)
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, daemon=True)
+                self._thread.start()
+            return self._keyframe_payload()
+
+    def unsubscribe(self, sid):
+        with self._lock:
+            self._subscribers.discard(sid)
+
+    def step(self, game):
+        """
+        处理一帧实时数据，返回需要推送的 (event, payload)；无需推送时返回 None。
+
+        event 为 live_game_keyframe（完整数据）、live_game_delta（变化字段）或 live_game_ended。
+        """
+        with self._lock:
+            if game is None:
+                if self._last is None:
+                    return None
+                self._last = None
+                return 'live_game_ended', {'tick': self._tick}
+
+            previous = self._last
+            self._tick += 1
+            self._last = game
+
+            changes = None
+            if previous is not None and self._tick - self._keyframe_tick < self.keyframe_interval:
+                changes = diff_players(previous, game)
+            if changes is None:
+                self._keyframe_tick = self._tick
+                return 'live_game_keyframe', self._keyframe_payload()
+
+            payload = {'tick': self._tick, 'base': self._tick - 1, 'players': changes, 'gameInfo': game.get('gameInfo')}
+            if game.get('recentKills') != previous.get('recentKills'):
+                payload['recentKills'] = game.get('recentKills')
+            return 'live_game_delta', payload
+
+    def _keyframe_payload(self):
+        if self._last is None:
+            return None
+        return {'tick': self._tick, 'game': self._last}
+
+    def _run(self):
+        logger.debug("📡 实时对局推送已启动")
+        while True:
+            with self._lock:
+                if not self._subscribers:
+                    self._thread = None
+                    self._last = None
+                    logger.debug("📡 实时对局推送已停止（无订阅者）")
+                    return
+
+            try:
+                game = lcu.get_client().get_live_game() if app_state.is_lcu_connected() else None
+                update = self.step(game)
+            except Exception as e:
+                logger.warning(f"⚠️ 实时对局推送失败: {e}")
+                update = None
+
+            if update:
+                event, payload = update
+                for callback in _live_listeners:
+                    try:
+                        callback(event, payload)
+                    except Exception as e:
+                        logger.warning(f"⚠️ 实时对局推送回调失败: {e}")
+
+            time.sleep(self.interval)
+
+
+live_publisher = LiveGamePublisher()
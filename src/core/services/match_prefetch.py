@@ -0,0 +1,102 @@
+"""
+对局详情预取服务
+在 /api/get_history 返回后，于后台低优先级地预先拉取当前页对局详情并写入详情缓存，
+用户展开对局时即可直接命中缓存。切换到其他召唤师时自动取消旧任务。
+"""
+import threading
+import time
+from collections import deque
+
+from core.services.match_service import load_match_detail
+from utils.logger import logger
+
+
+PREFETCH_WORKERS = 2
+# 每次拉取前的让步间隔，避免与用户的交互请求争抢 LCU
+PREFETCH_DELAY = 0.3
+
+
+class MatchPrefetcher:
+    def __init__(self, workers=PREFETCH_WORKERS, delay=PREFETCH_DELAY):
+        self.workers = workers
+        self.delay = delay
+        self._queue = deque()
+        self._cond = threading.Condition()
+        self._generation = 0
+        self._owner = None
+        self._threads = []
+
+    def schedule(self, client, puuid, game_ids):
+        """为 puuid 的当前页排队预取；puuid 变化时先 cancel() 丢弃之前的队列。"""
+        with self._cond:
+            if puuid != self._owner:
+                # Condition 默认使用可重入锁，可在持锁时调用 cancel
+                self.cancel()
+                self._owner = puuid
+            generation = self._generation
+            queued = {gid for _, _, gid in self._queue}
+
+        # 详情缓存的磁盘层需要 stat 文件，在锁外判断，避免阻塞工作线程
+        candidates = [
+            game_id for game_id in dict.fromkeys(game_ids)
+            if game_id and game_id not in queued and game_id not in client.match_details
+        ]
+        if not candidates:
+            return
+
+        with self._cond:
+            if generation != self._generation:
+                # 判断期间已切换到其他召唤师
+                return
+            queued = {gid for _, _, gid in self._queue}
+            added = 0
+            for game_id in candidates:
+                if game_id in queued:
+                    continue
+                self._queue.append((generation, client, game_id))
+                queued.add(game_id)
+                added += 1
+
+            if added:
+                logger.debug(f"📥 预取排队 {added} 场对局详情 (PUUID={str(puuid)[:8]}...)")
+                self._ensure_workers()
+                self._cond.notify_all()
+
+    def cancel(self):
+        """取消所有尚未开始的预取任务。"""
+        with self._cond:
+            self._generation += 1
+            self._queue.clear()
+            self._owner = None
+
+    def _ensure_workers(self):
+        self._threads = [t for t in self._threads if t.is_alive()]
+        while len(self._threads) < self.workers:
+            thread = threading.Thread(target=self._worker, daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def _is_current(self, generation):
+        return generation == self._generation
+
+    def _worker(self):
+        while True:
+            with self._cond:
+                while not self._queue:
+                    self._cond.wait()
+                generation, client, game_id = self._queue.popleft()
+
+            if not self._is_current(generation):
+                continue
+
+            time.sleep(self.delay)
+            if not self._is_current(generation) or game_id in client.match_details:
+                continue
+
+            try:
+                load_match_detail(client, game_id)
+            except Exception as e:
+                logger.debug(f"预取对局详情失败 (game_id={game_id}): {e}")
+
+
+prefetcher = MatchPrefetcher()
@@ -4,10 +4,15 @@ This module contains functions to produce summary objects for LOL/TFT
 matches and to process match history. Kept intentionally lightweight so
 routes can stay thin and focused on HTTP concerns.
 """
+import copy
+import threading
 from datetime import datetime
 import constants
 from core import lcu
-from core.lcu.enrichment import enrich_game_with_augments
+from core.lcu.enrichment import enrich_game_with_augments, is_enriched
+from core.store.coplayer_index import coplayer_index
+from core.store.derived import attach_derived_metrics
+from utils.logger import logger
 
 
 
@@ -194,6 +199,44 @@ def process_lol_match_history(history, puuid=None):
     return processed_games
 
 
+def process_lol_summaries(records):
+    """将紧凑摘要记录转换为列表视图使用的摘要字典。"""
+    processed_games = []
+    for idx, record in enumerate(records):
+        summary = summarize_lol_record(record)
+        summary['match_index'] = idx
+        processed_games.append(summary)
+    return processed_games
+
+
+def summarize_lol_record(record):
+    """与 process_single_lol_game 输出字段一致，但直接读取 MatchSummary。"""
+    summary = {
+        'win': record.win,
+        'champion_id': record.champion_id,
+        'champion_en': constants._get_champion_map().get(record.champion_id, f"Champion{record.champion_id}"),
+        'kda': record.kda,
+        'gold': int(record.gold_earned / 1000),
+        'cs': record.cs,
+        'champion_level': record.champion_level,
+        'gameMode': record.game_mode,
+        'mode': format_game_mode(record.game_mode),
+    }
+
+    if record.game_mode == 'CHERRY' and record.placement:
+        summary['placement'] = record.placement
+        summary['subteamPlacement'] = record.placement
+
+    summary['time_ago'] = calculate_time_ago(record.game_creation)
+    summary['game_creation'] = record.game_creation
+    summary['duration'] = record.duration
+    # 详情按 gameId 获取：过滤查询结果的序号与 LCU 历史序号不对应；
+    # 预取与详情缓存同样以 gameId 为键，页面请求才能命中预取结果
+    summary['match_id'] = record.game_id
+    summary['game_id'] = record.game_id
+    return summary
+
+
 def process_single_lol_game(game, puuid=None):
     if not isinstance(game, dict):
         return {}
@@ -314,8 +357,9 @@ def process_single_lol_game(game, puuid=None):
     game_length = game.get('gameDuration', 0)
     summary['duration'] = int(game_length) if game_length else 0
 
-    match_id = game.get('matchId', '')
-    summary['match_id'] = match_id
+    # 与 summarize_lol_record 一致，详情接口与缓存均以 gameId 为键
+    summary['match_id'] = game.get('gameId')
+    summary['game_id'] = game.get('gameId')
 
     return summary
 
@@ -330,6 +374,204 @@ def process_match_history(history, puuid=None):
     return processed_games
 
 
+def _unwrap_game(match_obj):
+    if isinstance(match_obj, dict) and 'game' in match_obj:
+        return match_obj.get('game')
+    return match_obj
+
+
+def _is_finished_game(game):
+    return isinstance(game, dict) and bool(game.get('gameDuration')) and bool(game.get('participants'))
+
+
+def _is_fully_enriched(game):
+    """所有参与者的名称、头像与 puuid 是否都已补齐。"""
+    return all(is_enriched(p) for p in game.get('participants') or [] if isinstance(p, dict))
+
+
+def _cached_match_detail(client, game_id):
+    cached = client.match_details.get(game_id)
+    if cached is None:
+        return None
+
+    details = client.match_details
+    if not details.is_partial(game_id) and not _is_fully_enriched(cached):
+        # 旧版本在补全不完整时也会落盘，这类条目作废后只留在内存层重试
+        details.invalidate(game_id)
+        details.put(game_id, cached, persist=False)
+    # 旧版本缓存中没有派生指标时补算一次并写回
+    if attach_derived_metrics(cached):
+        details.put(game_id, cached, persist=not details.is_partial(game_id))
+    return cached
+
+
+# 正在拉取/补全的对局：gameId -> Event（拉取方结束时 set），
+# 使预取、/api/get_match 与渐进式补全不会同时请求同一场对局
+_inflight = {}
+_inflight_lock = threading.Lock()
+# 等待其他调用方完成同一对局的最长时间（秒）
+INFLIGHT_WAIT = 10
+
+
+def _claim_match_detail(game_id):
+    """
+    登记为该对局的拉取方并返回 True；已有其他调用方在拉取时等待其结束（最多 INFLIGHT_WAIT 秒）并返回 False。
+    返回 True 的调用方结束后必须调用 release_match_detail。
+    """
+    key = str(game_id)
+    with _inflight_lock:
+        event = _inflight.get(key)
+        if event is None:
+            _inflight[key] = threading.Event()
+            return True
+    event.wait(INFLIGHT_WAIT)
+    return False
+
+
+def release_match_detail(game_id):
+    """结束对局的拉取登记，唤醒等待同一对局的调用方。"""
+    with _inflight_lock:
+        event = _inflight.pop(str(game_id), None)
+    if event is not None:
+        event.set()
+
+
+def store_match_detail(client, game_id, game):
+    """
+    补全结束的对局：已结束的写入详情缓存。
+
+    只有全部参与者的名称、头像与 puuid 都已补齐时才落盘并写入同场玩家索引；
+    否则只保留在内存层，下次请求时重试未补全的参与者。
+    """
+    if _is_finished_game(game):
+        attach_derived_metrics(game)
+        complete = _is_fully_enriched(game)
+        client.match_details.put(game_id, game, persist=complete)
+        if complete:
+            coplayer_index.ingest_game(game)
+
+
+def load_match_detail(client, game_id):
+    """
+    按 gameId 获取已补全（召唤师信息 + 海克斯 + 派生指标）的 LOL 对局详情。
+
+    优先命中 client.match_details 两级缓存；未命中时拉取并补全，
+    已结束的对局写回缓存。失败返回 None。
+    """
+    cached = _cached_match_detail(client, game_id)
+    if cached is not None and not client.match_details.is_partial(game_id):
+        return cached
+
+    if not _claim_match_detail(game_id):
+        # 其他调用方刚处理完同一对局，直接使用其结果
+        cached = _cached_match_detail(client, game_id)
+        if cached is not None:
+            return cached
+        return _fetch_match_detail(client, game_id, None)
+
+    try:
+        return _fetch_match_detail(client, game_id, cached)
+    finally:
+        release_match_detail(game_id)
+
+
+def _fetch_match_detail(client, game_id, cached):
+    if cached is not None:
+        # 内存层中的对象可能正被其他请求序列化，在副本上补全，完成后由 store_match_detail 整体替换
+        game = copy.deepcopy(cached)
+    else:
+        match_obj = client.get_match_by_id(game_id)
+        if not match_obj:
+            return None
+        game = _unwrap_game(match_obj)
+
+    try:
+        client.enrich_game_with_summoner_info(game)
+        enrich_game_with_augments(game)
+    except Exception as e:
+        logger.warning(f"⚠️ 召唤师信息补全失败 (game_id={game_id}): {e}")
+        return game
+
+    store_match_detail(client, game_id, game)
+    return game
+
+
+def begin_match_detail(client, game_id):
+    """
+    渐进式加载的第一步：只做不需要额外 LCU 请求的补全。
+
+    Returns:
+        tuple: (game, pending)。命中缓存或仅凭对局数据已补全时 pending 为空（对局已写入缓存）；
+        否则 pending 为仍需查询的参与者（包括内存层中上次未补全的），
+        调用方解析后用 store_match_detail 收尾，并在结束时调用 release_match_detail。
+        失败时 game 为 None
+    """
+    cached = _cached_match_detail(client, game_id)
+    if cached is not None and not client.match_details.is_partial(game_id):
+        return cached, []
+
+    if not _claim_match_detail(game_id):
+        # 其他调用方刚处理完同一对局：使用其结果，不再重复查询
+        cached = _cached_match_detail(client, game_id)
+        if cached is not None:
+            return cached, []
+        return load_match_detail(client, game_id), []
+
+    pending = []
+    try:
+        game, pending = _begin_match_detail(client, game_id, cached)
+        return game, pending
+    finally:
+        # 仍有待查询的参与者时由调用方在补全结束后释放
+        if not pending:
+            release_match_detail(game_id)
+
+
+def _begin_match_detail(client, game_id, cached):
+    if cached is not None:
+        # 内存层中的对象可能正被其他请求序列化，在副本上补全，完成后由 store_match_detail 整体替换
+        game = copy.deepcopy(cached)
+    else:
+        match_obj = client.get_match_by_id(game_id)
+        if not match_obj:
+            return None, []
+        game = _unwrap_game(match_obj)
+
+    try:
+        pending = client.plan_summoner_enrichment(game)
+        enrich_game_with_augments(game)
+    except Exception as e:
+        logger.warning(f"⚠️ 召唤师信息补全失败 (game_id={game_id}): {e}")
+        return game, []
+
+    if pending:
+        # 派生指标不依赖召唤师信息，首屏即可展示
+        if _is_finished_game(game):
+            attach_derived_metrics(game)
+    else:
+        store_match_detail(client, game_id, game)
+    return game, pending
+
+
+_coplayer_backfill_lock = threading.Lock()
+_coplayer_backfilled = False
+
+
+def backfill_coplayer_index(client):
+    """首次使用时把磁盘详情缓存中尚未索引的对局补录进同场玩家索引（每个进程只执行一次）。"""
+    global _coplayer_backfilled
+    with _coplayer_backfill_lock:
+        if _coplayer_backfilled:
+            return
+        _coplayer_backfilled = True
+
+        indexed = {str(game_id) for game_id in coplayer_index.game_ids()}
+        added = sum(1 for _, game in client.match_details.iter_disk(exclude=indexed)
+                    if coplayer_index.ingest_game(game))
+        if added:
+            logger.info(f"📇 同场玩家索引补录 {added} 场缓存对局")
+
+
 def get_match_detail(token, port, summoner_name, index, match_id=None, is_tft=False):
     """
     获取完整对局详情 (LOL 或 TFT)
@@ -344,17 +586,10 @@ def get_match_detail(token, port, summoner_name, index, match_id=None, is_tft=Fa
 
     # 如果有 match_id，直接通过 match_id 查询（仅支持 LOL）
     if match_id and not is_tft:
-        match_obj = client.get_match_by_id(match_id)
-        if match_obj:
-            game = match_obj.get('game') if (isinstance(match_obj, dict) and 'game' in match_obj) else match_obj
-            try:
-                client.enrich_game_with_summoner_info(game)
-                enrich_game_with_augments(game)
-            except Exception as e:
-                print(f"召唤师信息补全失败 (match_id path): {e}")
+        game = load_match_detail(client, match_id)
+        if game:
             return game
-        else:
-            raise RuntimeError("通过 match_id 获取对局失败")
+        raise RuntimeError("通过 match_id 获取对局失败")
 
     if not summoner_name or index is None:
         raise ValueError("缺少参数 name 或 index")
@@ -396,29 +631,30 @@ def get_match_detail(token, port, summoner_name, index, match_id=None, is_tft=Fa
             
         return game
     else:
-        # LOL 战绩查询
+        # LOL 战绩查询：已索引过的位置直接解析为 gameId，只需一次详情请求
+        game_id = client.resolve_game_id(puuid, index)
+        if game_id is not None:
+            game = load_match_detail(client, game_id)
+            if game is not None:
+                return game
+
         fetch_count = min(index + 20, 200)
-        history = client.get_match_history(puuid, count=fetch_count)
-        if not history:
+        records = client.get_match_summaries(puuid, count=fetch_count)
+        if records is None:
             raise RuntimeError("获取战绩失败")
 
-        games = history.get('games', {}).get('games', [])
-        if index < 0 or index >= len(games):
+        if index < 0 or index >= len(records):
             raise ValueError("索引越界")
 
-        game_summary = games[index]
-        game_match_id = game_summary.get('matchId') or game_summary.get('gameId') or game_summary.get('match_id')
-        
-        game = game_summary
-        if game_match_id:
-            full_game = client.get_match_by_id(game_match_id)
-            if full_game:
-                game = full_game.get('game') if (isinstance(full_game, dict) and 'game' in full_game) else full_game
-
-        try:
-            client.enrich_game_with_summoner_info(game)
-            enrich_game_with_augments(game)
-        except Exception as e:
-            print(f"召唤师信息补全失败: {e}")
+        record = records[index]
+        game = load_match_detail(client, record.game_id) if record.game_id else None
+        if game is None:
+            # 详情获取失败时退回列表中的原始数据（按需解码）
+            game = record.raw
+            try:
+                client.enrich_game_with_summoner_info(game)
+                enrich_game_with_augments(game)
+            except Exception as e:
+                print(f"召唤师信息补全失败: {e}")
 
         return game
@@ -0,0 +1,137 @@
+"""
+对局详情渐进式补全
+/api/get_match?progressive=true 先返回仅用对局数据补全的结果和一个令牌，
+仍需查询 LCU 的参与者在后台并发解析，每补全一名即推送到 match:{令牌} 房间；
+页面订阅晚于推送时通过 replay 补发，全部完成后写入详情缓存。
+"""
+import copy
+import threading
+import time
+import uuid
+
+from core.services.match_service import (
+    begin_match_detail,
+    release_match_detail,
+    store_match_detail,
+)
+from utils.logger import logger
+
+
+# 令牌保留时间（秒），超时后订阅只能拿到空回放
+STREAM_TTL = 120
+# 推送给页面的参与者字段
+PARTICIPANT_FIELDS = ('summonerName', 'profileIcon', 'puuid')
+
+_stream_listeners = []
+
+
+def add_stream_listener(callback):
+    """注册推送回调 callback(event, token, payload)（例如通过 Socket.IO 推送到令牌房间）。"""
+    if callback not in _stream_listeners:
+        _stream_listeners.append(callback)
+
+
+class _MatchStream:
+    __slots__ = ('created', 'done', 'events', 'game_id', 'token')
+
+    def __init__(self, token, game_id):
+        self.token = token
+        self.game_id = game_id
+        self.created = time.time()
+        self.events = []
+        self.done = False
+
+
+class MatchStreams:
+    def __init__(self, ttl=STREAM_TTL):
+        self.ttl = ttl
+        self._streams = {}
+        self._lock = threading.Lock()
+
+    def start(self, client, game_id):
+        """
+        返回 (game, token)。命中缓存或无需额外查询时 token 为 None，game 已完整；
+        否则 game 为首屏数据，其余参与者信息通过令牌房间推送。获取失败时 game 为 None。
+        """
+        game, pending = begin_match_detail(client, game_id)
+        if game is None or not pending:
+            return game, None
+
+        token = uuid.uuid4().hex
+        stream = _MatchStream(token, game_id)
+        with self._lock:
+            self._prune()
+            self._streams[token] = stream
+
+        # game 是 begin_match_detail 返回的私有对象，后台线程在其上补全，
+        # 完成后由 store_match_detail 整体放入缓存；响应使用此刻的副本
+        snapshot = copy.deepcopy(game)
+        try:
+            threading.Thread(
+                target=self._run,
+                args=(client, stream, game, pending),
+                daemon=True
+            ).start()
+        except RuntimeError:
+            release_match_detail(game_id)
+            raise
+        return snapshot, token
+
+    def replay(self, token, join=None):
+        """
+        返回令牌已推送过的 (event, payload) 列表；未知或已过期的令牌返回 None。
+
+        join 为加入推送房间的回调，与回放快照在同一把锁内执行，
+        保证之后的推送不会既出现在回放中又被房间重复收到。
+        """
+        with self._lock:
+            stream = self._streams.get(token)
+            if stream is None:
+                return None
+            if join:
+                join()
+            return list(stream.events)
+
+    def _run(self, client, stream, game, pending):
+        resolved = 0
+
+        def on_resolved(participant):
+            nonlocal resolved
+            resolved += 1
+            payload = {field: participant.get(field) for field in PARTICIPANT_FIELDS}
+            payload.update(token=stream.token, participantId=participant.get('participantId'))
+            self._publish(stream, 'match_participant', payload)
+
+        try:
+            client.resolve_summoner_enrichment(pending, on_resolved)
+            store_match_detail(client, stream.game_id, game)
+        except Exception as e:
+            logger.warning(f"⚠️ 渐进式补全失败 (game_id={stream.game_id}): {e}")
+        finally:
+            self._publish(stream, 'match_enriched', {
+                'token': stream.token,
+                'game_id': stream.game_id,
+                'resolved': resolved,
+                'pending': len(pending),
+            })
+            stream.done = True
+            release_match_detail(stream.game_id)
+
+    def _publish(self, stream, event, payload):
+        # 记录与推送在同一把锁内，与 replay 的“加入房间 + 快照”互斥
+        with self._lock:
+            stream.events.append((event, payload))
+            for callback in _stream_listeners:
+                try:
+                    callback(event, stream.token, payload)
+                except Exception as e:
+                    logger.warning(f"⚠️ 渐进式补全推送失败: {e}")
+
+    def _prune(self):
+        now = time.time()
+        expired = [t for t, s in self._streams.items() if s.done and now - s.created > self.ttl]
+        for token in expired:
+            self._streams.pop(token, None)
+
+
+match_streams = MatchStreams()
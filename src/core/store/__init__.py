@@ -0,0 +1,14 @@
+"""
+本地对局数据存储模块
+提供紧凑的战绩摘要、对局时间线、列式指标、本地战绩库、TFT 阵容索引等不依赖 LCU 连接的数据结构
+"""
+from .metrics import AugmentAggregates, ChampionAggregates, MetricColumns
+from .records import MatchSummary
+from .summary_store import SummaryStore
+from .tft_index import TftCompositionIndex, TftFingerprint
+from .timeline import MatchTimeline
+
+__all__ = [
+    'AugmentAggregates', 'ChampionAggregates', 'MatchSummary', 'MatchTimeline', 'MetricColumns', 'SummaryStore',
+    'TftCompositionIndex', 'TftFingerprint',
+]
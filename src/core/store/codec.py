@@ -0,0 +1,173 @@
+"""
+对局 JSON 压缩编解码
+LCU 对局数据中同一批字段名在 10 名参与者、成千上万场对局中反复出现，
+这里用 zlib 预设字典（zdict）预先放入这些字段名，单场对局也能获得接近批量压缩的效果。
+
+编码格式: 1 字节版本头 + zlib 数据流。版本头 0 表示无字典；
+不带版本头的旧数据（zlib 流首字节为 0x78）按普通 zlib 解码，保持向后兼容。
+修改字典内容时必须新增版本号，旧版本字典需保留以便解码已有数据。
+"""
+import json
+import threading
+import zlib
+
+
+# 对局顶层字段
+_GAME_KEYS = (
+    'endOfGameResult', 'gameCreation', 'gameCreationDate', 'gameDuration', 'gameId', 'gameMode',
+    'gameType', 'gameVersion', 'mapId', 'platformId', 'queueId', 'seasonId',
+)
+
+# 召唤师身份字段
+_PLAYER_KEYS = (
+    'accountId', 'currentAccountId', 'currentPlatformId', 'gameName', 'matchHistoryUri',
+    'platformId', 'profileIcon', 'puuid', 'summonerId', 'summonerName', 'tagLine',
+)
+
+# 队伍字段
+_TEAM_KEYS = (
+    'baronKills', 'dominionVictoryScore', 'dragonKills', 'firstBaron', 'firstDargon', 'firstInhibitor',
+    'firstTower', 'hordeKills', 'inhibitorKills', 'riftHeraldKills', 'teamId', 'towerKills',
+    'vilemawKills', 'win',
+)
+
+# 参与者时间线字段
+_TIMELINE_KEYS = (
+    'creepsPerMinDeltas', 'csDiffPerMinDeltas', 'damageTakenDiffPerMinDeltas', 'damageTakenPerMinDeltas',
+    'goldPerMinDeltas', 'lane', 'participantId', 'role', 'xpDiffPerMinDeltas', 'xpPerMinDeltas',
+)
+
+# 参与者统计字段（出现频率最高，放在字典末尾，zlib 对末尾内容的匹配距离最短）
+_STATS_KEYS = (
+    'assists', 'causedEarlySurrender', 'champLevel', 'combatPlayerScore', 'damageDealtToObjectives',
+    'damageDealtToTurrets', 'damageSelfMitigated', 'deaths', 'doubleKills', 'earlySurrenderAccomplice',
+    'firstBloodAssist', 'firstBloodKill', 'firstInhibitorAssist', 'firstInhibitorKill',
+    'firstTowerAssist', 'firstTowerKill', 'gameEndedInEarlySurrender', 'gameEndedInSurrender',
+    'goldEarned', 'goldSpent', 'inhibitorKills', 'item0', 'item1', 'item2', 'item3', 'item4',
+    'item5', 'item6', 'killingSprees', 'kills', 'largestCriticalStrike', 'largestKillingSpree',
+    'largestMultiKill', 'longestTimeSpentLiving', 'magicDamageDealt', 'magicDamageDealtToChampions',
+    'magicalDamageTaken', 'neutralMinionsKilled', 'neutralMinionsKilledEnemyJungle',
+    'neutralMinionsKilledTeamJungle', 'objectivePlayerScore', 'participantId', 'pentaKills',
+    'perk0', 'perk0Var1', 'perk0Var2', 'perk0Var3', 'perk1', 'perk1Var1', 'perk1Var2', 'perk1Var3',
+    'perk2', 'perk2Var1', 'perk2Var2', 'perk2Var3', 'perk3', 'perk3Var1', 'perk3Var2', 'perk3Var3',
+    'perk4', 'perk4Var1', 'perk4Var2', 'perk4Var3', 'perk5', 'perk5Var1', 'perk5Var2', 'perk5Var3',
+    'perkPrimaryStyle', 'perkSubStyle', 'physicalDamageDealt', 'physicalDamageDealtToChampions',
+    'physicalDamageTaken', 'playerAugment1', 'playerAugment2', 'playerAugment3', 'playerAugment4',
+    'playerAugment5', 'playerAugment6', 'playerScore0', 'playerScore1', 'playerScore2',
+    'playerScore3', 'playerScore4', 'playerScore5', 'playerScore6', 'playerScore7', 'playerScore8',
+    'playerScore9', 'playerSubteamId', 'quadraKills', 'sightWardsBoughtInGame', 'subteamPlacement',
+    'teamEarlySurrendered', 'timeCCingOthers', 'totalDamageDealt', 'totalDamageDealtToChampions',
+    'totalDamageTaken', 'totalHeal', 'totalMinionsKilled', 'totalPlayerScore', 'totalScoreRank',
+    'totalTimeCrowdControlDealt', 'totalUnitsHealed', 'tripleKills', 'trueDamageDealt',
+    'trueDamageDealtToChampions', 'trueDamageTaken', 'turretKills', 'unrealKills', 'visionScore',
+    'visionWardsBoughtInGame', 'wardsKilled', 'wardsPlaced', 'win',
+)
+
+
+def _build_dictionary_v1():
+    """以一场“空白”对局的紧凑 JSON 作为预设字典，结构与真实数据的字段顺序保持一致。"""
+    sample = {key: 0 for key in _GAME_KEYS}
+    sample['participantIdentities'] = [
+        {'participantId': 1, 'player': {key: '' for key in _PLAYER_KEYS}}
+    ]
+    sample['teams'] = [
+        dict({key: 0 for key in _TEAM_KEYS}, bans=[{'championId': 0, 'pickTurn': 1}], win='Fail')
+    ]
+    sample['participants'] = [{
+        'championId': 0,
+        'highestAchievedSeasonTier': 'UNRANKED',
+        'participantId': 1,
+        'spell1Id': 4,
+        'spell2Id': 14,
+        'stats': dict({key: 0 for key in _STATS_KEYS}, win=False),
+        'teamId': 100,
+        'timeline': {key: {} for key in _TIMELINE_KEYS},
+    }]
+    return json.dumps(sample, separators=(',', ':')).encode('utf-8')
+
+
+# 版本号 -> 预设字典；0 为无字典
+_DICTIONARIES = {
+    0: None,
+    1: _build_dictionary_v1(),
+}
+CURRENT_VERSION = 1
+
+_ZLIB_HEADER = 0x78
+_COMPRESS_LEVEL = 6
+
+
+class _CodecStats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.encoded = 0
+        self.decoded = 0
+        self.raw_bytes = 0
+        self.encoded_bytes = 0
+
+    def record_encode(self, raw_size, encoded_size):
+        with self._lock:
+            self.encoded += 1
+            self.raw_bytes += raw_size
+            self.encoded_bytes += encoded_size
+
+    def record_decode(self):
+        with self._lock:
+            self.decoded += 1
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                'version': CURRENT_VERSION,
+                'dictionary_bytes': len(_DICTIONARIES[CURRENT_VERSION] or b''),
+                'encoded': self.encoded,
+                'decoded': self.decoded,
+                'raw_bytes': self.raw_bytes,
+                'encoded_bytes': self.encoded_bytes,
+                'ratio': round(self.raw_bytes / self.encoded_bytes, 2) if self.encoded_bytes else 0.0,
+            }
+
+
+_stats = _CodecStats()
+
+
+def encode(value, version=CURRENT_VERSION):
+    """把可 JSON 序列化的对象编码为带版本头的压缩字节。"""
+    raw = json.dumps(value, separators=(',', ':')).encode('utf-8')
+    zdict = _DICTIONARIES[version]
+    compressor = zlib.compressobj(_COMPRESS_LEVEL, zdict=zdict) if zdict else zlib.compressobj(_COMPRESS_LEVEL)
+    data = bytes((version,)) + compressor.compress(raw) + compressor.flush()
+    _stats.record_encode(len(raw), len(data))
+    return data
+
+
+def decode(data):
+    """
+    解码 encode() 的输出；同时兼容不带版本头的普通 zlib 数据。
+
+    Raises:
+        ValueError: 未知版本或数据损坏
+    """
+    if not data:
+        raise ValueError('empty payload')
+
+    version = data[0]
+    try:
+        if version == _ZLIB_HEADER:
+            raw = zlib.decompress(data)
+        else:
+            if version not in _DICTIONARIES:
+                raise ValueError(f'unknown codec version: {version}')
+            zdict = _DICTIONARIES[version]
+            decompressor = zlib.decompressobj(zdict=zdict) if zdict else zlib.decompressobj()
+            raw = decompressor.decompress(data[1:]) + decompressor.flush()
+    except zlib.error as exc:
+        raise ValueError(str(exc)) from exc
+
+    _stats.record_decode()
+    return json.loads(raw)
+
+
+def codec_stats():
+    """返回累计的编码次数、原始/压缩字节数与压缩比。"""
+    return _stats.snapshot()
@@ -0,0 +1,203 @@
+"""
+同场玩家倒排索引
+记录每个 puuid 出现过的对局及每场对局的参与者（队伍、胜负），用于识别双排/组排队友。
+索引随对局详情写入增量更新，以只追加的 JSON Lines 文件持久化，查询时不再解析原始对局。
+"""
+import json
+import os
+import threading
+
+from config import CACHE_DIR
+from utils.logger import logger
+from .records import _resolve_win, _to_int
+
+
+def extract_roster(game):
+    """
+    从 LCU 对局详情中提取参与者列表。
+
+    Returns:
+        list: [(puuid, team_id, win, name), ...]，无法识别 puuid 的参与者会被跳过
+    """
+    idents = {}
+    for ident in (game.get('participantIdentities') or []):
+        if isinstance(ident, dict) and ident.get('participantId') is not None:
+            idents[ident['participantId']] = ident.get('player') or {}
+
+    roster = []
+    for p in (game.get('participants') or []):
+        if not isinstance(p, dict):
+            continue
+        player = idents.get(p.get('participantId')) or {}
+        puuid = p.get('puuid') or player.get('puuid')
+        if not puuid:
+            continue
+
+        name = p.get('summonerName') or ''
+        if not name and player.get('gameName'):
+            name = f"{player['gameName']}#{player.get('tagLine', '')}".rstrip('#')
+        roster.append((puuid, _to_int(p.get('teamId')), _resolve_win(game, p), name))
+    return roster
+
+
+class CoPlayerIndex:
+    def __init__(self, cache_dir):
+        self._path = os.path.join(cache_dir, 'coplayers.jsonl') if cache_dir else None
+        self._games = {}          # game_id -> (game_creation, queue_id, ((puuid, team_id, win), ...))
+        self._player_games = {}   # puuid -> set(game_id)
+        self._names = {}          # puuid -> (game_creation, 最近一次出现时的名称)
+        self._lock = threading.Lock()
+        self._loaded = False
+
+    def _ensure_loaded(self):
+        if self._loaded:
+            return
+        self._loaded = True
+        if not self._path or not os.path.exists(self._path):
+            return
+        try:
+            with open(self._path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    if line.strip():
+                        row = json.loads(line)
+                        self._add(row['g'], row['t'], row['q'], row['p'])
+        except (OSError, ValueError, KeyError, TypeError) as exc:
+            logger.warning(f"⚠️ 读取同场玩家索引失败: {exc}")
+
+    def _add(self, game_id, creation, queue_id, roster):
+        if game_id in self._games:
+            return False
+        self._games[game_id] = (creation, queue_id, tuple((puuid, team, win) for puuid, team, win, _ in roster))
+        for puuid, _, _, name in roster:
+            self._player_games.setdefault(puuid, set()).add(game_id)
+            if name and creation >= self._names.get(puuid, (0, ''))[0]:
+                self._names[puuid] = (creation, name)
+        return True
+
+    def load(self):
+        """预先从磁盘加载索引，避免首次查询时的读盘延迟。"""
+        with self._lock:
+            self._ensure_loaded()
+
+    def __contains__(self, game_id):
+        with self._lock:
+            self._ensure_loaded()
+            return _to_int(game_id) in self._games
+
+    def game_ids(self):
+        with self._lock:
+            self._ensure_loaded()
+            return set(self._games)
+
+    def ingest_game(self, game):
+        """写入一场已结束对局；已索引过或无法识别参与者时返回 False。"""
+        if not isinstance(game, dict):
+            return False
+        game_id = _to_int(game.get('gameId'))
+        roster = extract_roster(game)
+        if not game_id or not roster:
+            return False
+
+        creation = _to_int(game.get('gameCreation'))
+        queue_id = _to_int(game.get('queueId'))
+        with self._lock:
+            self._ensure_loaded()
+            if not self._add(game_id, creation, queue_id, roster):
+                return False
+
+            if self._path:
+                row = {'g': game_id, 't': creation, 'q': queue_id, 'p': roster}
+                try:
+                    os.makedirs(os.path.dirname(self._path), exist_ok=True)
+                    with open(self._path, 'a', encoding='utf-8') as f:
+                        f.write(json.dumps(row, ensure_ascii=False, separators=(',', ':')) + '\n')
+                except OSError as exc:
+                    logger.warning(f"⚠️ 写入同场玩家索引失败: {exc}")
+        return True
+
+    def name_of(self, puuid):
+        with self._lock:
+            self._ensure_loaded()
+            return self._names.get(puuid, (0, ''))[1]
+
+    def head_to_head(self, puuid, other):
+        """
+        puuid 与 other 的历史同场记录（两者对局集合求交，不读取原始对局）。
+
+        Returns:
+            dict | None: {games, with: {games, wins}, against: {games, wins}, last_seen, last_together, last_win}，
+            胜场均以 puuid 视角计算；没有同场记录时返回 None
+        """
+        with self._lock:
+            self._ensure_loaded()
+            shared = self._player_games.get(puuid, set()) & self._player_games.get(other, set())
+            if not shared:
+                return None
+
+            result = {
+                'games': len(shared),
+                'with': {'games': 0, 'wins': 0},
+                'against': {'games': 0, 'wins': 0},
+                'last_seen': 0,
+                'last_together': None,
+                'last_win': None,
+            }
+            for game_id in shared:
+                creation, _, roster = self._games[game_id]
+                teams = {p: (team, win) for p, team, win in roster}
+                my_team, my_win = teams[puuid]
+                together = teams[other][0] == my_team
+
+                bucket = result['with'] if together else result['against']
+                bucket['games'] += 1
+                bucket['wins'] += 1 if my_win else 0
+                if creation >= result['last_seen']:
+                    result['last_seen'] = creation
+                    result['last_together'] = together
+                    result['last_win'] = my_win
+            return result
+
+    def co_players(self, puuid, limit=10, min_games=2):
+        """
+        统计与 puuid 同队次数最多的玩家。
+
+        Returns:
+            tuple: (puuid 已索引的对局数, [{puuid, name, games, wins, win_rate, last_played}, ...])
+        """
+        with self._lock:
+            self._ensure_loaded()
+            game_ids = self._player_games.get(puuid, ())
+            totals = {}  # other -> [games, wins, last_played]
+            for game_id in game_ids:
+                creation, _, roster = self._games[game_id]
+                mine = next((entry for entry in roster if entry[0] == puuid), None)
+                if mine is None:
+                    continue
+                for other, team, _ in roster:
+                    if other == puuid or team != mine[1]:
+                        continue
+                    entry = totals.setdefault(other, [0, 0, 0])
+                    entry[0] += 1
+                    entry[1] += 1 if mine[2] else 0
+                    entry[2] = max(entry[2], creation)
+
+            ranked = sorted(
+                ((other, v) for other, v in totals.items() if v[0] >= min_games),
+                key=lambda item: (item[1][0], item[1][2]),
+                reverse=True,
+            )[:limit]
+            result = [
+                {
+                    'puuid': other,
+                    'name': self._names.get(other, (0, ''))[1],
+                    'games': games,
+                    'wins': wins,
+                    'win_rate': round(wins / games, 3),
+                    'last_played': last_played,
+                }
+                for other, (games, wins, last_played) in ranked
+            ]
+            return len(game_ids), result
+
+
+coplayer_index = CoPlayerIndex(CACHE_DIR)
@@ -0,0 +1,110 @@
+"""
+对局派生指标
+参团率、伤害/经济/承伤占比与各项分均数据在对局写入缓存前一次性算好，
+随对局一起缓存，详情页直接读取 participant['derived']，无需每次查看时重新汇总队伍数据。
+"""
+from .records import _to_int
+
+
+DERIVED_VERSION = 1
+
+# 派生指标用到的原始统计列：列名 -> stats 字段
+_STAT_COLUMNS = {
+    'kills': 'kills',
+    'deaths': 'deaths',
+    'assists': 'assists',
+    'damage': 'totalDamageDealtToChampions',
+    'damage_taken': 'totalDamageTaken',
+    'gold': 'goldEarned',
+    'minions': 'totalMinionsKilled',
+    'jungle': 'neutralMinionsKilled',
+    'vision': 'visionScore',
+}
+
+
+def _share(value, total):
+    return round(value / total, 3) if total else 0.0
+
+
+def _per_min(value, minutes):
+    return round(value / minutes, 2) if minutes else 0.0
+
+
+def _team_key(game, participant, stats):
+    """斗魂竞技场按小队（playerSubteamId）分组，其余模式按 teamId。"""
+    if game.get('gameMode') == 'CHERRY':
+        subteam = _to_int(stats.get('playerSubteamId') or participant.get('playerSubteamId'))
+        if subteam:
+            return subteam
+    return _to_int(participant.get('teamId'))
+
+
+def compute_derived_metrics(game):
+    """
+    计算全部参与者的派生指标（两次遍历：先累加队伍合计，再逐人计算占比与分均）。
+
+    Returns:
+        tuple: ({participantId: 指标字典}, {队伍键: 队伍合计})；无参与者时为 ({}, {})
+    """
+    participants = [p for p in (game.get('participants') or []) if isinstance(p, dict)]
+    if not participants:
+        return {}, {}
+
+    # 每名参与者的 stats 只读取一次，队伍合计与占比都基于这份数值
+    rows = []
+    for p in participants:
+        stats = p.get('stats') if isinstance(p.get('stats'), dict) else {}
+        values = {name: _to_int(stats.get(key)) for name, key in _STAT_COLUMNS.items()}
+        rows.append((p, _team_key(game, p, stats), values))
+
+    team_totals = {}
+    for _, team, values in rows:
+        totals = team_totals.setdefault(team, dict.fromkeys(_STAT_COLUMNS, 0))
+        for name, value in values.items():
+            totals[name] += value
+
+    minutes = _to_int(game.get('gameDuration')) / 60
+    derived = {}
+    for p, team, values in rows:
+        totals = team_totals[team]
+        kills = values['kills']
+        cs = values['minions'] + values['jungle']
+        derived[_to_int(p.get('participantId'))] = {
+            'version': DERIVED_VERSION,
+            'team': team,
+            'killParticipation': _share(kills + values['assists'], totals['kills']),
+            'damageShare': _share(values['damage'], totals['damage']),
+            'damageTakenShare': _share(values['damage_taken'], totals['damage_taken']),
+            'goldShare': _share(values['gold'], totals['gold']),
+            'killsPerMin': _per_min(kills, minutes),
+            'deathsPerMin': _per_min(values['deaths'], minutes),
+            'damagePerMin': _per_min(values['damage'], minutes),
+            'goldPerMin': _per_min(values['gold'], minutes),
+            'csPerMin': _per_min(cs, minutes),
+            'visionPerMin': _per_min(values['vision'], minutes),
+        }
+    return derived, team_totals
+
+
+def attach_derived_metrics(game):
+    """
+    把派生指标写入对局：每个参与者的 derived 字段与对局级 teamTotals。
+    已是当前版本时直接返回 False，计算并写入后返回 True。
+    """
+    if not isinstance(game, dict):
+        return False
+    if (game.get('teamTotals') or {}).get('version') == DERIVED_VERSION:
+        return False
+
+    derived, team_totals = compute_derived_metrics(game)
+    for p in game.get('participants') or []:
+        if isinstance(p, dict):
+            metrics = derived.get(_to_int(p.get('participantId')))
+            if metrics is not None:
+                p['derived'] = metrics
+
+    game['teamTotals'] = {
+        'version': DERIVED_VERSION,
+        'teams': {str(team): totals for team, totals in team_totals.items()},
+    }
+    return True
@@ -0,0 +1,232 @@
+"""
+列式对局指标
+每个指标一列 array，行与对局一一对应，胜率、KDA、分均补刀、分英雄统计等
+直接在列切片上用内置 sum() 等 C 层迭代完成，不再逐场遍历字典或在前端拆分 kda 字符串。
+"""
+from array import array
+from operator import itemgetter
+
+
+# 列名 -> (array 类型码, MatchSummary 属性名)
+COLUMNS = {
+    'kills': ('i', 'kills'),
+    'deaths': ('i', 'deaths'),
+    'assists': ('i', 'assists'),
+    'gold': ('i', 'gold_earned'),
+    'damage': ('i', 'damage'),
+    'cs': ('i', 'cs'),
+    'duration': ('i', 'duration'),
+    'win': ('b', 'win'),
+    'champion_id': ('i', 'champion_id'),
+    'queue_id': ('i', 'queue_id'),
+}
+
+
+class MetricColumns:
+    """一组对局（按时间倒序）的列式指标。"""
+
+    __slots__ = tuple(COLUMNS)
+
+    def __init__(self):
+        for name, (typecode, _) in COLUMNS.items():
+            setattr(self, name, array(typecode))
+
+    @classmethod
+    def from_records(cls, records):
+        columns = cls()
+        for record in records:
+            columns.append(record)
+        return columns
+
+    def __len__(self):
+        return len(self.kills)
+
+    def append(self, record):
+        self.insert(len(self), record)
+
+    def insert(self, index, record):
+        for name, (_, attr) in COLUMNS.items():
+            getattr(self, name).insert(index, int(getattr(record, attr) or 0))
+
+    def aggregate(self, start=0, stop=None, by_champion=False, rows=None):
+        """
+        汇总 [start, stop) 区间内的对局；给出 rows（行号序列）时改为汇总这些行。
+
+        Returns:
+            dict: games/wins/losses/win_rate(百分比)/kills/deaths/assists(总和)/avg_*/kda/cs_per_min，
+            by_champion 时附带按英雄拆分的同结构统计（champions 列表，按场次降序）
+        """
+        if rows is not None:
+            select = _row_selector(rows)
+        else:
+            stop = len(self) if stop is None else min(stop, len(self))
+            start = max(0, min(start, stop))
+            select = itemgetter(slice(start, stop))
+
+        result = _summarize(
+            len(select(self.win)),
+            sum(select(self.win)),
+            sum(select(self.kills)),
+            sum(select(self.deaths)),
+            sum(select(self.assists)),
+            sum(select(self.gold)),
+            sum(select(self.damage)),
+            sum(select(self.cs)),
+            sum(select(self.duration)),
+        )
+        if by_champion:
+            result['champions'] = self._by_champion(select)
+        return result
+
+    def _by_champion(self, select):
+        totals = {}  # champion_id -> [games, wins, kills, deaths, assists, gold, damage, cs, duration]
+        rows = zip(
+            select(self.champion_id), select(self.win), select(self.kills),
+            select(self.deaths), select(self.assists), select(self.gold),
+            select(self.damage), select(self.cs), select(self.duration),
+        )
+        for champion_id, *values in rows:
+            entry = totals.get(champion_id)
+            if entry is None:
+                entry = totals[champion_id] = [0] * 9
+            entry[0] += 1
+            for i, value in enumerate(values, 1):
+                entry[i] += value
+
+        champions = [dict(_summarize(*entry), champion_id=champion_id) for champion_id, entry in totals.items()]
+        champions.sort(key=lambda item: (-item['games'], item['champion_id']))
+        return champions
+
+
+def _row_selector(rows):
+    """返回从列中按行号取值的函数（itemgetter 在 C 层完成取值，结果始终为序列）。"""
+    rows = list(rows)
+    if not rows:
+        return lambda column: ()
+    getter = itemgetter(*rows)
+    if len(rows) == 1:
+        return lambda column: (getter(column),)
+    return getter
+
+
+class ChampionAggregates:
+    """
+    按 (championId, queueId) 维护的累计汇总。
+    每写入一场对局 O(1) 更新，查询分英雄统计的代价只与英雄数量有关，与对局数量无关。
+    """
+
+    __slots__ = ('_totals',)
+
+    def __init__(self):
+        # (champion_id, queue_id) -> [games, wins, kills, deaths, assists, gold, damage, cs, duration]
+        self._totals = {}
+
+    def add(self, record):
+        key = (int(record.champion_id or 0), int(record.queue_id or 0))
+        entry = self._totals.get(key)
+        if entry is None:
+            entry = self._totals[key] = [0] * 9
+        entry[0] += 1
+        entry[1] += 1 if record.win else 0
+        entry[2] += record.kills or 0
+        entry[3] += record.deaths or 0
+        entry[4] += record.assists or 0
+        entry[5] += record.gold_earned or 0
+        entry[6] += record.damage or 0
+        entry[7] += record.cs or 0
+        entry[8] += record.duration or 0
+
+    def summary(self, queue_id=None):
+        """
+        返回分英雄统计（按场次降序）；queue_id 为 None 时合并所有队列。
+
+        Returns:
+            list: [{champion_id, games, wins, win_rate, kda, ...}, ...]，字段同 MetricColumns.aggregate
+        """
+        merged = {}
+        for (champion_id, queue), entry in self._totals.items():
+            if queue_id is not None and queue != queue_id:
+                continue
+            target = merged.get(champion_id)
+            if target is None:
+                merged[champion_id] = list(entry)
+            else:
+                for i, value in enumerate(entry):
+                    target[i] += value
+
+        champions = [dict(_summarize(*entry), champion_id=champion_id) for champion_id, entry in merged.items()]
+        champions.sort(key=lambda item: (-item['games'], item['champion_id']))
+        return champions
+
+
+class AugmentAggregates:
+    """
+    按 (gameMode, augmentId) 维护的海克斯统计（斗魂竞技场 / 海克斯大乱斗）。
+    每写入一场对局 O(选择的海克斯数) 更新，单个海克斯的查询为 O(1)。
+    """
+
+    __slots__ = ('_totals',)
+
+    def __init__(self):
+        # (game_mode, augment_id) -> [games, wins, placement_sum, placed_games]
+        self._totals = {}
+
+    def add(self, record):
+        if not record.augments:
+            return
+        for augment_id in set(record.augments):
+            key = (record.game_mode, int(augment_id))
+            entry = self._totals.get(key)
+            if entry is None:
+                entry = self._totals[key] = [0, 0, 0, 0]
+            entry[0] += 1
+            entry[1] += 1 if record.win else 0
+            if record.placement:
+                entry[2] += record.placement
+                entry[3] += 1
+
+    def get(self, game_mode, augment_id):
+        entry = self._totals.get((game_mode, int(augment_id)))
+        return _summarize_augment(game_mode, int(augment_id), entry) if entry else None
+
+    def summary(self, game_mode=None):
+        """返回全部海克斯统计（按场次降序）；game_mode 为 None 时包含所有模式。"""
+        augments = [
+            _summarize_augment(mode, augment_id, entry)
+            for (mode, augment_id), entry in self._totals.items()
+            if game_mode is None or mode == game_mode
+        ]
+        augments.sort(key=lambda item: (-item['games'], item['augment_id']))
+        return augments
+
+
+def _summarize_augment(game_mode, augment_id, entry):
+    games, wins, placement_sum, placed_games = entry
+    return {
+        'game_mode': game_mode,
+        'augment_id': augment_id,
+        'games': games,
+        'wins': wins,
+        'win_rate': round(wins / games * 100, 1) if games else 0.0,
+        'avg_placement': round(placement_sum / placed_games, 2) if placed_games else None,
+    }
+
+
+def _summarize(games, wins, kills, deaths, assists, gold, damage, cs, duration):
+    return {
+        'games': games,
+        'wins': wins,
+        'losses': games - wins,
+        'win_rate': round(wins / games * 100, 1) if games else 0.0,
+        'kills': kills,
+        'deaths': deaths,
+        'assists': assists,
+        'avg_kills': round(kills / games, 1) if games else 0.0,
+        'avg_deaths': round(deaths / games, 1) if games else 0.0,
+        'avg_assists': round(assists / games, 1) if games else 0.0,
+        # 零死亡时为 None（前端显示 Perfect）
+        'kda': round((kills + assists) / deaths, 2) if deaths else None,
+        'avg_gold': round(gold / games) if games else 0,
+        'avg_damage': round(damage / games) if games else 0,
+        'cs_per_min': round(cs / (duration / 60), 1) if duration else 0.0,
+    }
@@ -0,0 +1,190 @@
+"""
+紧凑战绩摘要记录
+只保留列表视图需要的字段，原始对局 JSON 以压缩字节保存、按需解码。
+"""
+import re
+import sys
+
+from . import codec
+
+# LCU 的 puuid 为小写十六进制加连字符；用作文件名前必须符合该形状
+_PUUID_RE = re.compile(r'[0-9a-f-]{1,100}')
+
+
+def _to_int(value, default=0):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return default
+
+
+def is_valid_puuid(value):
+    return isinstance(value, str) and _PUUID_RE.fullmatch(value) is not None
+
+
+def _find_participant(game, puuid):
+    """定位 puuid 对应的参与者；找不到时退回第一个（通常就是查询用户）。"""
+    participants = game.get('participants', [])
+    if not isinstance(participants, list):
+        participants = []
+
+    if puuid:
+        for p in participants:
+            if isinstance(p, dict) and p.get('puuid') == puuid:
+                return p
+
+        for ident in (game.get('participantIdentities') or []):
+            player = (ident or {}).get('player') or {}
+            if player.get('puuid') == puuid:
+                pid = ident.get('participantId')
+                for p in participants:
+                    if isinstance(p, dict) and p.get('participantId') == pid:
+                        return p
+
+    if participants and isinstance(participants[0], dict):
+        return participants[0]
+    return None
+
+
+def _resolve_win(game, participant):
+    participant_win = participant.get('win')
+    if participant_win is not None:
+        return bool(participant_win)
+
+    stats_win = (participant.get('stats') or {}).get('win')
+    if stats_win is not None:
+        return bool(stats_win)
+
+    team_id = participant.get('teamId', 0)
+    for team in game.get('teams', []) or []:
+        if team.get('teamId') == team_id:
+            team_win = team.get('win', 'Fail')
+            if isinstance(team_win, str):
+                return team_win == 'Win'
+            return bool(team_win)
+    return False
+
+
+class MatchSummary:
+    """单场 LOL 对局的紧凑摘要（面向某个 puuid 的视角）。"""
+
+    __slots__ = (
+        '_raw', 'assists', 'augments', 'champion_id', 'champion_level', 'cs', 'damage', 'deaths', 'duration',
+        'game_creation', 'game_id', 'game_mode', 'gold_earned', 'kills', 'match_id', 'placement', 'queue_id', 'win',
+    )
+
+    def __init__(self, game_id, match_id='', game_creation=0, duration=0, game_mode='CLASSIC',
+                 queue_id=0, champion_id=0, win=False, kills=0, deaths=0, assists=0,
+                 gold_earned=0, cs=0, champion_level=0, damage=0, placement=0,
+                 augments=(), raw=None):
+        self.game_id = game_id
+        self.match_id = match_id
+        self.game_creation = game_creation
+        self.duration = duration
+        self.game_mode = game_mode
+        self.queue_id = queue_id
+        self.champion_id = champion_id
+        self.win = win
+        self.kills = kills
+        self.deaths = deaths
+        self.assists = assists
+        self.gold_earned = gold_earned
+        self.cs = cs
+        self.champion_level = champion_level
+        self.damage = damage
+        self.placement = placement
+        self.augments = augments
+        self._raw = raw
+
+    @classmethod
+    def from_game(cls, game, puuid=None, keep_raw=True):
+        """从 LCU 原始对局构建摘要；keep_raw 时附带压缩后的原始 JSON。"""
+        participant = _find_participant(game, puuid) or {}
+        stats = participant.get('stats') or {}
+        if not isinstance(stats, dict):
+            stats = {}
+
+        game_mode = game.get('gameMode', 'CLASSIC')
+
+        placement = 0
+        if game_mode == 'CHERRY':
+            placement = _to_int(
+                stats.get('subteamPlacement') or
+                stats.get('placement') or
+                participant.get('subteamPlacement') or
+                participant.get('placement') or
+                0
+            )
+
+        augments = tuple(
+            _to_int(stats.get(f'playerAugment{i}'))
+            for i in range(1, 7)
+            if _to_int(stats.get(f'playerAugment{i}')) > 0
+        )
+
+        return cls(
+            game_id=game.get('gameId'),
+            match_id=game.get('matchId', '') or '',
+            game_creation=game.get('gameCreation', 0) or 0,
+            duration=_to_int(game.get('gameDuration', 0)),
+            game_mode=game_mode,
+            queue_id=_to_int(game.get('queueId', 0)),
+            champion_id=participant.get('championId', 0) or 0,
+            win=_resolve_win(game, participant) if participant else False,
+            kills=_to_int(stats.get('kills', 0)),
+            deaths=_to_int(stats.get('deaths', 0)),
+            assists=_to_int(stats.get('assists', 0)),
+            gold_earned=_to_int(stats.get('goldEarned', 0)),
+            cs=_to_int(stats.get('totalMinionsKilled', 0)) + _to_int(stats.get('neutralMinionsKilled', 0)),
+            champion_level=_to_int(stats.get('champLevel', 0)),
+            damage=_to_int(stats.get('totalDamageDealtToChampions', 0)),
+            placement=placement,
+            augments=augments,
+            raw=cls.encode_raw(game) if keep_raw else None,
+        )
+
+    # 持久化行格式中的字段顺序（不含原始 JSON）
+    ROW_FIELDS = (
+        'game_id', 'match_id', 'game_creation', 'duration', 'game_mode', 'queue_id',
+        'champion_id', 'win', 'kills', 'deaths', 'assists', 'gold_earned', 'cs',
+        'champion_level', 'damage', 'placement', 'augments',
+    )
+
+    def to_row(self):
+        return [getattr(self, name) for name in self.ROW_FIELDS]
+
+    @classmethod
+    def from_row(cls, row):
+        record = cls(**dict(zip(cls.ROW_FIELDS, row)))
+        record.augments = tuple(record.augments or ())
+        return record
+
+    def without_raw(self):
+        """返回不带原始 JSON 的副本，用于长期存储。"""
+        return self.from_row(self.to_row())
+
+    @staticmethod
+    def encode_raw(game):
+        return codec.encode(game)
+
+    @property
+    def has_raw(self):
+        return self._raw is not None
+
+    @property
+    def raw(self):
+        """按需解码原始对局 JSON（每次返回新的 dict，不常驻内存）。"""
+        if self._raw is None:
+            return None
+        return codec.decode(self._raw)
+
+    @property
+    def kda(self):
+        return f"{self.kills}/{self.deaths}/{self.assists}"
+
+    def approx_size(self):
+        """估算常驻内存字节数（对象本体 + 压缩原始数据）。"""
+        return sys.getsizeof(self) + (len(self._raw) if self._raw else 0) + 64
+
+    def __repr__(self):
+        return f"MatchSummary(game_id={self.game_id}, champion_id={self.champion_id}, win={self.win})"
@@ -0,0 +1,232 @@
+"""
+本地战绩摘要库
+按 puuid 累积所有拉取过的 MatchSummary（不含原始 JSON），建立英雄/队列/模式二级索引，
+在本地完成过滤查询，不受 LCU 单次最多 50 场的限制。
+每个 puuid 对应磁盘上一份只追加的 JSON Lines 文件。
+"""
+import bisect
+import json
+import os
+import threading
+from collections import OrderedDict
+
+from config import CACHE_DIR
+from utils.logger import logger
+from .metrics import AugmentAggregates, ChampionAggregates, MetricColumns
+from .records import MatchSummary, is_valid_puuid
+
+
+# 流式遍历时每次持锁读取的行数
+ITER_CHUNK = 256
+# 内存中最多保留的 puuid 摘要集合数，超出后淘汰最久未访问的（磁盘文件仍在，需要时重新加载）
+MAX_BOOKS = 32
+
+
+class _SummaryBook:
+    """单个 puuid 的摘要集合与索引。"""
+
+    def __init__(self):
+        self.records = {}        # game_id -> MatchSummary
+        self.order = []          # (-game_creation, game_id)，按时间倒序
+        self.by_champion = {}    # champion_id -> set(game_id)
+        self.by_queue = {}       # queue_id -> set(game_id)
+        self.by_mode = {}        # game_mode -> set(game_id)
+        self.metrics = MetricColumns()  # 与 order 同序的列式指标
+        self.champions = ChampionAggregates()  # (英雄, 队列) 累计汇总
+        self.augments = AugmentAggregates()    # (模式, 海克斯) 累计汇总
+
+    def add(self, record):
+        if record.game_id is None or record.game_id in self.records:
+            return False
+        self.records[record.game_id] = record
+        key = (-(record.game_creation or 0), record.game_id)
+        position = bisect.bisect_left(self.order, key)
+        self.order.insert(position, key)
+        self.metrics.insert(position, record)
+        self.champions.add(record)
+        self.augments.add(record)
+        self.by_champion.setdefault(record.champion_id, set()).add(record.game_id)
+        self.by_queue.setdefault(record.queue_id, set()).add(record.game_id)
+        self.by_mode.setdefault(record.game_mode, set()).add(record.game_id)
+        return True
+
+
+class SummaryStore:
+    def __init__(self, cache_dir, max_books=MAX_BOOKS):
+        self._dir = os.path.join(cache_dir, 'summaries') if cache_dir else None
+        self.max_books = max_books
+        self._books = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _path(self, puuid):
+        return os.path.join(self._dir, f"{puuid}.jsonl")
+
+    def _book(self, puuid):
+        """取得 puuid 的摘要集合，首次访问时从磁盘加载；非法 puuid 返回不缓存的空集合。"""
+        if not is_valid_puuid(puuid):
+            return _SummaryBook()
+
+        book = self._books.get(puuid)
+        if book is not None:
+            self._books.move_to_end(puuid)
+            return book
+
+        book = _SummaryBook()
+        if self._dir and os.path.exists(self._path(puuid)):
+            try:
+                with open(self._path(puuid), 'r', encoding='utf-8') as f:
+                    for line in f:
+                        if line.strip():
+                            book.add(MatchSummary.from_row(json.loads(line)))
+            except (OSError, ValueError, TypeError) as exc:
+                logger.warning(f"⚠️ 读取本地战绩库失败 (PUUID={puuid[:8]}...): {exc}")
+        self._books[puuid] = book
+        while len(self._books) > self.max_books:
+            self._books.popitem(last=False)
+        return book
+
+    def ingest(self, puuid, records):
+        """写入一批摘要（按 gameId 去重），返回新增条数。"""
+        if not is_valid_puuid(puuid):
+            logger.warning(f"⚠️ 忽略非法 PUUID 的战绩摘要: {puuid!r}")
+            return 0
+        with self._lock:
+            book = self._book(puuid)
+            added = []
+            for record in records:
+                stored = record.without_raw()
+                if book.add(stored):
+                    added.append(stored)
+
+            if added and self._dir:
+                try:
+                    os.makedirs(self._dir, exist_ok=True)
+                    with open(self._path(puuid), 'a', encoding='utf-8') as f:
+                        for record in added:
+                            f.write(json.dumps(record.to_row(), separators=(',', ':')) + '\n')
+                except OSError as exc:
+                    logger.warning(f"⚠️ 写入本地战绩库失败 (PUUID={puuid[:8]}...): {exc}")
+
+            return len(added)
+
+    def count(self, puuid):
+        with self._lock:
+            return len(self._book(puuid).records)
+
+    def iter_records(self, puuid, champion_id=None, queue_id=None, game_mode=None, win=None,
+                     start_time=None, end_time=None, chunk=ITER_CHUNK):
+        """
+        按时间倒序惰性遍历 puuid 的摘要，过滤条件与 query 相同。
+
+        每次只在锁内取出 chunk 行，之后从上次位置的排序键继续，
+        内存占用与总行数无关；遍历期间写入的新对局不会导致重复或遗漏已有行。
+        """
+        cursor = None
+        while True:
+            with self._lock:
+                book = self._book(puuid)
+                order = book.order
+                if cursor is not None:
+                    position = bisect.bisect_right(order, cursor)
+                elif end_time is not None:
+                    position = bisect.bisect_left(order, (-end_time,))
+                else:
+                    position = 0
+                keys = order[position:position + chunk]
+                batch = [book.records[game_id] for _, game_id in keys]
+            if not keys:
+                return
+
+            for record in batch:
+                if start_time is not None and (record.game_creation or 0) < start_time:
+                    return
+                if champion_id is not None and record.champion_id != champion_id:
+                    continue
+                if queue_id is not None and record.queue_id != queue_id:
+                    continue
+                if game_mode is not None and record.game_mode != game_mode:
+                    continue
+                if win is not None and record.win != win:
+                    continue
+                yield record
+            cursor = keys[-1]
+
+    def aggregate(self, puuid, start=0, stop=None, by_champion=False):
+        """在按时间倒序的第 [start, stop) 场对局上计算列式汇总指标。"""
+        with self._lock:
+            return self._book(puuid).metrics.aggregate(start, stop, by_champion=by_champion)
+
+    def aggregate_games(self, puuid, game_ids, by_champion=False):
+        """
+        在本地库维护的列上汇总指定的对局（按 gameId 定位行）。
+
+        Returns:
+            dict | None: 同 aggregate；有对局不在本地库中（例如 puuid 非法）时返回 None，由调用方自行汇总
+        """
+        with self._lock:
+            book = self._book(puuid)
+            rows = []
+            for game_id in game_ids:
+                record = book.records.get(game_id)
+                if record is None:
+                    return None
+                rows.append(bisect.bisect_left(book.order, (-(record.game_creation or 0), game_id)))
+            return book.metrics.aggregate(rows=rows, by_champion=by_champion)
+
+    def champion_summary(self, puuid, queue_id=None):
+        """分英雄统计（读取累计汇总，代价与英雄数量成正比）。"""
+        with self._lock:
+            return self._book(puuid).champions.summary(queue_id)
+
+    def augment_summary(self, puuid, game_mode=None, augment_id=None):
+        """海克斯统计；指定 augment_id 时只返回该海克斯（O(1)），否则返回全部。"""
+        with self._lock:
+            augments = self._book(puuid).augments
+            if augment_id is not None:
+                modes = (game_mode,) if game_mode else ('CHERRY', 'KIWI')
+                return [entry for entry in (augments.get(mode, augment_id) for mode in modes) if entry]
+            return augments.summary(game_mode)
+
+    def query(self, puuid, champion_id=None, queue_id=None, game_mode=None, win=None,
+              start_time=None, end_time=None, limit=20, offset=0):
+        """
+        按条件查询摘要，结果按时间倒序。
+
+        Returns:
+            tuple: (本页记录列表, 满足条件的总数)
+        """
+        with self._lock:
+            book = self._book(puuid)
+
+            candidate_sets = []
+            if champion_id is not None:
+                candidate_sets.append(book.by_champion.get(champion_id, set()))
+            if queue_id is not None:
+                candidate_sets.append(book.by_queue.get(queue_id, set()))
+            if game_mode is not None:
+                candidate_sets.append(book.by_mode.get(game_mode, set()))
+
+            candidates = None
+            if candidate_sets:
+                candidate_sets.sort(key=len)
+                candidates = set.intersection(*candidate_sets)
+                if not candidates:
+                    return [], 0
+
+            # 时间倒序：order 中的键为 -game_creation
+            lo = bisect.bisect_left(book.order, (-end_time,)) if end_time is not None else 0
+            hi = bisect.bisect_right(book.order, (-start_time, float('inf'))) if start_time is not None else len(book.order)
+
+            matched = []
+            for _, game_id in book.order[lo:hi]:
+                if candidates is not None and game_id not in candidates:
+                    continue
+                record = book.records[game_id]
+                if win is not None and record.win != win:
+                    continue
+                matched.append(record)
+
+        return matched[offset:offset + limit], len(matched)
+
+
+summary_store = SummaryStore(CACHE_DIR)
@@ -0,0 +1,231 @@
+"""
+云顶之弈阵容指纹索引
+把每场 TFT 对局的最终棋盘（棋子、羁绊等级、强化符文）压缩为一条指纹，
+按核心羁绊聚类并建立棋子倒排索引，用于“同类阵容下我的名次”之类的查询。
+每个 puuid 对应磁盘上一份只追加的 JSON Lines 文件，查询时不再解析原始对局。
+"""
+import json
+import os
+import threading
+from collections import OrderedDict
+
+from config import CACHE_DIR
+from utils.logger import logger
+from .records import _to_int, is_valid_puuid
+
+
+# 以羁绊等级最高的前两个羁绊作为阵容簇
+CLUSTER_TRAITS = 2
+# “相似阵容”要求的最低棋子重合度（Jaccard）
+DEFAULT_SIMILARITY = 0.5
+# 内存中最多保留的 puuid 阵容索引数，超出后淘汰最久未访问的（磁盘文件仍在，需要时重新加载）
+MAX_BOOKS = 32
+
+
+class TftFingerprint:
+    """单场 TFT 对局中某名玩家的最终阵容指纹。"""
+
+    __slots__ = ('augments', 'cluster', 'game_creation', 'match_id', 'placement', 'traits', 'units')
+
+    def __init__(self, match_id, game_creation=0, placement=8, cluster='', units=(), traits=(), augments=()):
+        self.match_id = match_id
+        self.game_creation = game_creation
+        self.placement = placement
+        self.cluster = cluster
+        self.units = frozenset(units)
+        self.traits = tuple(traits)
+        self.augments = tuple(augments)
+
+    @classmethod
+    def from_game(cls, game, puuid):
+        """从 LCU TFT 对局中提取 puuid 的阵容；找不到该玩家时返回 None。"""
+        if not isinstance(game, dict):
+            return None
+        game_json = game.get('json') if isinstance(game.get('json'), dict) else game
+        metadata = game.get('metadata') if isinstance(game.get('metadata'), dict) else {}
+        match_id = metadata.get('match_id') or game_json.get('game_id') or game_json.get('gameId')
+        if not match_id:
+            return None
+
+        participant = next(
+            (p for p in (game_json.get('participants') or []) if isinstance(p, dict) and p.get('puuid') == puuid),
+            None
+        )
+        if participant is None:
+            return None
+
+        active = [
+            t for t in (participant.get('traits') or [])
+            if isinstance(t, dict) and _to_int(t.get('style')) > 0
+        ]
+        active.sort(key=lambda t: (_to_int(t.get('style')), _to_int(t.get('num_units'))), reverse=True)
+        cluster = '+'.join(sorted(str(t.get('name')) for t in active[:CLUSTER_TRAITS]))
+
+        units = {
+            str(u.get('character_id'))
+            for u in (participant.get('units') or [])
+            if isinstance(u, dict) and u.get('character_id')
+        }
+        return cls(
+            match_id=str(match_id),
+            game_creation=_to_int(game_json.get('gameCreation') or game_json.get('game_datetime')),
+            placement=_to_int(participant.get('placement')) or 8,
+            cluster=cluster,
+            units=units,
+            traits=[f"{t.get('name')}:{_to_int(t.get('style'))}" for t in active],
+            augments=[str(a) for a in (participant.get('augments') or []) if a],
+        )
+
+    def to_row(self):
+        return [self.match_id, self.game_creation, self.placement, self.cluster,
+                sorted(self.units), list(self.traits), list(self.augments)]
+
+    @classmethod
+    def from_row(cls, row):
+        return cls(*row)
+
+
+class _TftBook:
+    """单个 puuid 的阵容指纹与索引。"""
+
+    def __init__(self):
+        self.fingerprints = {}   # match_id -> TftFingerprint
+        self.by_cluster = {}     # cluster -> set(match_id)
+        self.by_unit = {}        # character_id -> set(match_id)
+
+    def add(self, fingerprint):
+        if fingerprint.match_id in self.fingerprints:
+            return False
+        self.fingerprints[fingerprint.match_id] = fingerprint
+        self.by_cluster.setdefault(fingerprint.cluster, set()).add(fingerprint.match_id)
+        for unit in fingerprint.units:
+            self.by_unit.setdefault(unit, set()).add(fingerprint.match_id)
+        return True
+
+
+def _placement_summary(fingerprints):
+    games = len(fingerprints)
+    placements = [fp.placement for fp in fingerprints]
+    return {
+        'games': games,
+        'avg_placement': round(sum(placements) / games, 2) if games else None,
+        'top4_rate': round(sum(1 for p in placements if p <= 4) / games * 100, 1) if games else 0.0,
+        'wins': sum(1 for p in placements if p == 1),
+    }
+
+
+class TftCompositionIndex:
+    def __init__(self, cache_dir, max_books=MAX_BOOKS):
+        self._dir = os.path.join(cache_dir, 'tft_boards') if cache_dir else None
+        self.max_books = max_books
+        self._books = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _path(self, puuid):
+        return os.path.join(self._dir, f"{puuid}.jsonl")
+
+    def _book(self, puuid):
+        """取得 puuid 的阵容索引，首次访问时从磁盘加载；非法 puuid 返回不缓存的空索引。"""
+        if not is_valid_puuid(puuid):
+            return _TftBook()
+
+        book = self._books.get(puuid)
+        if book is not None:
+            self._books.move_to_end(puuid)
+            return book
+
+        book = _TftBook()
+        if self._dir and os.path.exists(self._path(puuid)):
+            try:
+                with open(self._path(puuid), 'r', encoding='utf-8') as f:
+                    for line in f:
+                        if line.strip():
+                            book.add(TftFingerprint.from_row(json.loads(line)))
+            except (OSError, ValueError, TypeError) as exc:
+                logger.warning(f"⚠️ 读取 TFT 阵容索引失败 (PUUID={puuid[:8]}...): {exc}")
+        self._books[puuid] = book
+        while len(self._books) > self.max_books:
+            self._books.popitem(last=False)
+        return book
+
+    def ingest(self, puuid, games):
+        """写入一批 TFT 对局（按 match_id 去重），返回新增条数。"""
+        if not is_valid_puuid(puuid):
+            logger.warning(f"⚠️ 忽略非法 PUUID 的 TFT 阵容: {puuid!r}")
+            return 0
+        fingerprints = [fp for fp in (TftFingerprint.from_game(g, puuid) for g in games) if fp]
+        with self._lock:
+            book = self._book(puuid)
+            added = [fp for fp in fingerprints if book.add(fp)]
+
+            if added and self._dir:
+                try:
+                    os.makedirs(self._dir, exist_ok=True)
+                    with open(self._path(puuid), 'a', encoding='utf-8') as f:
+                        f.writelines(
+                            json.dumps(fp.to_row(), ensure_ascii=False, separators=(',', ':')) + '\n' for fp in added
+                        )
+                except OSError as exc:
+                    logger.warning(f"⚠️ 写入 TFT 阵容索引失败 (PUUID={puuid[:8]}...): {exc}")
+
+            return len(added)
+
+    def clusters(self, puuid, min_games=1):
+        """
+        按阵容簇汇总名次（按场次降序）。
+
+        Returns:
+            list: [{cluster, games, avg_placement, top4_rate, wins, common_units}, ...]
+        """
+        with self._lock:
+            book = self._book(puuid)
+            result = []
+            for cluster, match_ids in book.by_cluster.items():
+                if len(match_ids) < min_games:
+                    continue
+                fingerprints = [book.fingerprints[m] for m in match_ids]
+                unit_counts = {}
+                for fp in fingerprints:
+                    for unit in fp.units:
+                        unit_counts[unit] = unit_counts.get(unit, 0) + 1
+                common_units = sorted(unit_counts, key=lambda u: (-unit_counts[u], u))[:8]
+                result.append(dict(_placement_summary(fingerprints), cluster=cluster, common_units=common_units))
+
+        result.sort(key=lambda item: (-item['games'], item['avg_placement'], item['cluster']))
+        return result
+
+    def similar(self, puuid, match_id, threshold=DEFAULT_SIMILARITY):
+        """
+        查找与 match_id 那局棋子重合度不低于 threshold 的对局（通过棋子倒排索引只比较有交集的对局）。
+
+        Returns:
+            dict | None: 参考阵容与相似对局的名次汇总；match_id 未索引时返回 None
+        """
+        with self._lock:
+            book = self._book(puuid)
+            reference = book.fingerprints.get(str(match_id))
+            if reference is None:
+                return None
+
+            overlap = {}
+            for unit in reference.units:
+                for other in book.by_unit.get(unit, ()):
+                    overlap[other] = overlap.get(other, 0) + 1
+
+            matches = []
+            for other, shared in overlap.items():
+                fp = book.fingerprints[other]
+                union = len(reference.units | fp.units)
+                if union and shared / union >= threshold:
+                    matches.append(fp)
+
+        return dict(
+            _placement_summary(matches),
+            reference={'match_id': reference.match_id, 'cluster': reference.cluster,
+                       'units': sorted(reference.units), 'placement': reference.placement},
+            threshold=threshold,
+            match_ids=[fp.match_id for fp in sorted(matches, key=lambda fp: -fp.game_creation)],
+        )
+
+
+tft_index = TftCompositionIndex(CACHE_DIR)
@@ -0,0 +1,110 @@
+"""
+紧凑对局时间线
+每名参与者的逐分钟金币、经验、补刀以 array('i') 打包保存，事件只保留常用字段。
+"""
+from array import array
+
+from .records import _to_int
+
+
+# 事件中保留的字段（丢弃坐标等体积大且前端用不到的数据）
+EVENT_KEYS = (
+    'type', 'timestamp', 'participantId', 'killerId', 'victimId', 'assistingParticipantIds',
+    'teamId', 'itemId', 'skillSlot', 'levelUpType', 'monsterType', 'monsterSubType',
+    'buildingType', 'laneType', 'towerType', 'wardType', 'creatorId',
+)
+
+
+def _compact_event(event):
+    return {k: event[k] for k in EVENT_KEYS if event.get(k) not in (None, '', [])}
+
+
+class MatchTimeline:
+    """单场对局的紧凑时间线。"""
+
+    __slots__ = ('cs', 'events', 'frame_interval', 'game_id', 'gold', 'timestamps', 'xp')
+
+    def __init__(self, game_id, frame_interval=60000, timestamps=None, gold=None, xp=None, cs=None, events=None):
+        self.game_id = game_id
+        self.frame_interval = frame_interval
+        self.timestamps = timestamps if timestamps is not None else array('i')
+        self.gold = gold or {}
+        self.xp = xp or {}
+        self.cs = cs or {}
+        self.events = events or []
+
+    @classmethod
+    def from_lcu(cls, game_id, payload):
+        """从 LCU game-timelines 原始响应构建；无有效帧时返回 None。"""
+        if not isinstance(payload, dict):
+            return None
+        frames = payload.get('frames') or []
+        if not frames:
+            return None
+
+        parsed = []
+        count = 0
+        for frame in frames:
+            if not isinstance(frame, dict):
+                continue
+            by_pid = {}
+            for key, pf in (frame.get('participantFrames') or {}).items():
+                if isinstance(pf, dict):
+                    pid = _to_int(pf.get('participantId') or key)
+                    if pid > 0:
+                        by_pid[pid] = pf
+            count = max(count, max(by_pid, default=0))
+            parsed.append((frame, by_pid))
+
+        timeline = cls(game_id, frame_interval=_to_int(payload.get('frameInterval')) or 60000)
+        # 参与者 ID 为 1..N；某帧缺少的参与者补 0，保证每列都与 timestamps 逐帧对齐
+        pids = range(1, count + 1)
+        for pid in pids:
+            timeline.gold[pid] = array('i')
+            timeline.xp[pid] = array('i')
+            timeline.cs[pid] = array('i')
+
+        for frame, by_pid in parsed:
+            timeline.timestamps.append(_to_int(frame.get('timestamp')))
+
+            for pid in pids:
+                pf = by_pid.get(pid, {})
+                timeline.gold[pid].append(_to_int(pf.get('totalGold')))
+                timeline.xp[pid].append(_to_int(pf.get('xp')))
+                timeline.cs[pid].append(_to_int(pf.get('minionsKilled')) + _to_int(pf.get('jungleMinionsKilled')))
+
+            for event in frame.get('events') or []:
+                if isinstance(event, dict):
+                    timeline.events.append(_compact_event(event))
+
+        return timeline
+
+    def to_dict(self):
+        """转换为 JSON 友好的结构（同时也是磁盘缓存格式）。"""
+        return {
+            'gameId': self.game_id,
+            'frameInterval': self.frame_interval,
+            'timestamps': self.timestamps.tolist(),
+            'participants': {
+                str(pid): {
+                    'gold': self.gold[pid].tolist(),
+                    'xp': self.xp.get(pid, array('i')).tolist(),
+                    'cs': self.cs.get(pid, array('i')).tolist(),
+                }
+                for pid in sorted(self.gold)
+            },
+            'events': self.events,
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        participants = data.get('participants') or {}
+        return cls(
+            data.get('gameId'),
+            frame_interval=data.get('frameInterval', 60000),
+            timestamps=array('i', data.get('timestamps') or []),
+            gold={int(pid): array('i', v.get('gold') or []) for pid, v in participants.items()},
+            xp={int(pid): array('i', v.get('xp') or []) for pid, v in participants.items()},
+            cs={int(pid): array('i', v.get('cs') or []) for pid, v in participants.items()},
+            events=data.get('events') or [],
+        )
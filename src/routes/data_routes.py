@@ -2,17 +2,121 @@
 数据 API 路由模块
 处理所有数据获取的 API 端点
 """
-from flask import Blueprint, request, jsonify
+from datetime import datetime
 
+from flask import Blueprint, Response, request, jsonify, stream_with_context
+
+import constants
 from config import app_state
 from core import lcu
-from core.services.match_service import process_lol_match_history, process_single_tft_game, get_match_detail
+from core.services.match_service import (
+    process_lol_summaries, process_single_tft_game, get_match_detail, backfill_coplayer_index
+)
 from core.services.opgg_service import fetch_champion_stats
+from core.services.export_service import EXPORT_FORMATS, iter_export
+from core.services.match_prefetch import prefetcher
+from core.services.match_stream import match_streams
+from core.store.coplayer_index import coplayer_index
+from core.store.metrics import MetricColumns
+from core.store.records import is_valid_puuid
+from core.store.summary_store import summary_store
+from core.store.tft_index import tft_index
 
 # 创建数据 API 蓝图
 data_bp = Blueprint('data', __name__)
 
 
+def _sync_recent_summaries(client, puuid):
+    """把最近 20 场 LOL 对局写入本地战绩库（命中缓存时不会访问 LCU）。"""
+    client.get_match_summaries(puuid, count=20)
+
+
+def _resolve_and_sync(summoner_name, puuid, sync=_sync_recent_summaries):
+    """
+    由 name / puuid 查询参数确定召唤师，并在已连接时同步最近的对局到本地数据。
+
+    已连接时缺少 puuid 则按名称查询，再调用 sync(client, puuid)（sync 为 None 时不同步）；
+    未连接时只能使用请求直接给出的 puuid，读取已有的本地数据。
+
+    Returns:
+        tuple: (puuid, None)；失败时为 (None, 错误响应)
+    """
+    if not summoner_name and not puuid:
+        return None, (jsonify({"success": False, "message": "请求缺少召唤师名称 (name) 或 puuid 查询参数"}), 400)
+
+    if app_state.is_lcu_connected():
+        client = lcu.get_client()
+        if not puuid:
+            puuid = client.get_puuid(summoner_name)
+        if puuid and sync:
+            sync(client, puuid)
+    if not puuid:
+        return None, (jsonify({"success": False, "message": f"找不到召唤师 '{summoner_name}' 或未连接到客户端"}), 404)
+    if not is_valid_puuid(puuid):
+        return None, (jsonify({"success": False, "message": "puuid 格式无效"}), 400)
+    return puuid, None
+
+
+def _page_stats(puuid, records, by_champion=True):
+    """本页对局的汇总指标：优先使用本地战绩库维护的列，本地库缺少其中对局时按记录现算。"""
+    stats = summary_store.aggregate_games(puuid, [record.game_id for record in records], by_champion=by_champion)
+    if stats is None:
+        stats = MetricColumns.from_records(records).aggregate(by_champion=by_champion)
+    return stats
+
+
+def _parse_time_arg(value, end_of_day=False):
+    """解析时间参数：毫秒时间戳或 YYYY-MM-DD 日期（按本地时区）。"""
+    if value is None or value == '':
+        return None
+    if value.isdigit():
+        return int(value)
+    day = datetime.strptime(value, '%Y-%m-%d')
+    timestamp = int(day.timestamp() * 1000)
+    return timestamp + 86400 * 1000 - 1 if end_of_day else timestamp
+
+
+def _parse_history_filters(args):
+    """
+    从查询参数中解析战绩过滤条件；未提供任何条件时返回空字典。
+
+    Raises:
+        ValueError: 参数格式错误
+    """
+    filters = {}
+
+    champion_id = args.get('champion_id') or args.get('championId')
+    if champion_id:
+        filters['champion_id'] = int(champion_id)
+
+    queue_id = args.get('queue_id') or args.get('queueId')
+    if queue_id:
+        filters['queue_id'] = int(queue_id)
+
+    game_mode = args.get('game_mode') or args.get('gameMode')
+    if game_mode:
+        filters['game_mode'] = game_mode.upper()
+
+    win = args.get('win')
+    if win:
+        if win.lower() in ('1', 'true', 'win'):
+            filters['win'] = True
+        elif win.lower() in ('0', 'false', 'loss', 'lose'):
+            filters['win'] = False
+        else:
+            raise ValueError(f"无效的 win 参数: {win}")
+
+    start_time = _parse_time_arg(args.get('start'))
+    if start_time is not None:
+        filters['start_time'] = start_time
+
+    end_time = _parse_time_arg(args.get('end'), end_of_day=True)
+    if end_time is not None:
+        filters['end_time'] = end_time
+
+    return filters
+
+
 @data_bp.route('/lcu_status', methods=['GET'])
 def lcu_status():
     """Return current LCU connection state from server-side detection."""
@@ -33,37 +137,30 @@ def get_history():
         puuid: 或直接使用 puuid
         count: 每页数量 (默认20，最大200)
         page: 页码 (默认1，表示第1-20场；page=2表示第21-40场)
+        prefetch: 为 1 时在后台预取本页对局详情（战绩详情页使用）
+
+    过滤参数（任一存在时改为查询本地战绩库，包含以往拉取过的全部对局）:
+        champion_id: 英雄 ID
+        queue_id / queueId: 队列 ID（如 420 单双排、1700 斗魂竞技场）
+        game_mode / gameMode: 游戏模式（如 CLASSIC、ARAM、CHERRY）
+        win: true / false
+        start, end: 时间范围，毫秒时间戳或 YYYY-MM-DD
     
     Returns:
         JSON: 包含战绩数据的响应
     """
     # support either name OR puuid to speed up lookups from client
-    summoner_name = request.args.get('name')
-    puuid = request.args.get('puuid')
-
-    if not summoner_name and not puuid:
-        return jsonify({
-            "success": False,
-            "message": "请求缺少召唤师名称 (name) 或 puuid 查询参数"
-        })
-
     if not app_state.is_lcu_connected():
         return jsonify({
             "success": False,
             "message": "未连接到客户端"
         })
 
-    # 获取PUUID（若客户端未直接提供）
-    token = app_state.lcu_credentials["auth_token"]
-    port = app_state.lcu_credentials["app_port"]
+    # 获取PUUID（若客户端未直接提供）；本页数据在下面按分页参数拉取
+    puuid, error = _resolve_and_sync(request.args.get('name'), request.args.get('puuid'), sync=None)
+    if error:
+        return error
     client = lcu.get_client()
-    if not puuid:
-        puuid = client.get_puuid(summoner_name)
-        if not puuid:
-            return jsonify({
-                "success": False,
-                "message": f"找不到召唤师 '{summoner_name}' 或 LCU API 失败"
-            })
 
     # 🚀 优化：默认只查询 20 场，支持分页查询
     count = request.args.get('count', 20, type=int)  # 每页数量
@@ -74,17 +171,45 @@ def get_history():
     
     # 计算beginIndex: page=1 -> beginIndex=0; page=2 -> beginIndex=20
     begin_index = (page - 1) * count
+
+    try:
+        filters = _parse_history_filters(request.args)
+    except ValueError as e:
+        return jsonify({
+            "success": False,
+            "message": f"过滤参数无效: {e}"
+        }), 400
+
+    if filters:
+        # 先确保最近的对局已写入本地战绩库（命中缓存时不会访问 LCU）
+        client.get_match_summaries(puuid, count=count)
+        matched, total = summary_store.query(puuid, limit=count, offset=begin_index, **filters)
+        return jsonify({
+            "success": True,
+            "games": process_lol_summaries(matched),
+            "page": page,
+            "count": count,
+            "puuid": puuid,
+            "total": total,
+            "filters": filters,
+            "stats": _page_stats(puuid, matched),
+            "stale": False
+        })
     
-    # 获取战绩
-    history = client.get_match_history(puuid, count=count, begin_index=begin_index)
-    if not history:
+    # 获取战绩（紧凑摘要记录，不解码原始对局）
+    records = client.get_match_summaries(puuid, count=count, begin_index=begin_index)
+    if records is None:
         return jsonify({
             "success": False,
             "message": "获取战绩失败"
         })
     
     # 处理数据
-    processed_games = process_lol_match_history(history, puuid)
+    processed_games = process_lol_summaries(records)
+
+    # 用户通常会依次展开本页的多场对局，后台预先填充详情缓存
+    if request.args.get('prefetch') == '1':
+        prefetcher.schedule(client, puuid, [record.game_id for record in records])
     
     # OP.GG integration removed: processed_games contains core match info only.
     
@@ -92,10 +217,62 @@ def get_history():
         "success": True, 
         "games": processed_games,
         "page": page,
-        "count": count
+        "count": count,
+        "puuid": puuid,
+        # 本页对局的汇总指标（胜率、KDA、分均补刀、分英雄统计），前端无需再逐场累加
+        "stats": _page_stats(puuid, records),
+        # 过期缓存会立即返回并在后台刷新，有新对局时通过 history_updated 事件推送
+        "stale": records.stale
     })
 
 
+@data_bp.route('/export/history', methods=['GET'])
+def export_history():
+    """
+    以流式响应导出召唤师的全部本地战绩摘要（每场一行）
+
+    查询参数:
+        name / puuid: 同 /get_history
+        format: ndjson（默认）或 csv
+        其余过滤参数与 /get_history 相同
+    """
+    fmt = (request.args.get('format') or 'ndjson').lower()
+    if fmt not in EXPORT_FORMATS:
+        return jsonify({"success": False, "message": f"不支持的导出格式: {fmt}"}), 400
+
+    try:
+        filters = _parse_history_filters(request.args)
+    except ValueError as e:
+        return jsonify({"success": False, "message": f"过滤参数无效: {e}"}), 400
+
+    # 已连接时先同步最近的对局到本地战绩库；未连接时直接导出已有数据
+    puuid, error = _resolve_and_sync(request.args.get('name'), request.args.get('puuid'))
+    if error:
+        return error
+
+    # 逐块读取并在生成器内过滤，内存占用与导出行数无关
+    records = summary_store.iter_records(puuid, **filters)
+
+    mimetype = 'text/csv' if fmt == 'csv' else 'application/x-ndjson'
+    # puuid 已由 _resolve_and_sync 校验为 [0-9a-f-]，可安全用于文件名
+    filename = f"history_{puuid[:8]}.{fmt}"
+    return Response(
+        stream_with_context(iter_export(records, fmt)),
+        content_type=f"{mimetype}; charset=utf-8",
+        headers={"Content-Disposition": f"attachment; filename={filename}"},
+    )
+
+
+@data_bp.route('/cache_stats', methods=['GET'])
+def cache_stats():
+    """返回战绩缓存与对局详情缓存的命中、未命中与内存占用统计。"""
+    if not app_state.is_lcu_connected():
+        return jsonify({"success": False, "message": "未连接到客户端"}), 400
+
+    client = lcu.get_client()
+    return jsonify({"success": True, **client.get_match_cache_stats()})
+
+
 @data_bp.route('/get_tft_history', methods=['GET'])
 def get_tft_history():
     """
@@ -220,15 +397,32 @@ def get_match():
         index: 在 /get_history 返回的 games 列表中的索引 (整数，0 表示最近一场)
         match_id: 对局 ID（可选，直接通过对局ID查询）
         is_tft: 是否为 TFT 对局（true/false）
+        progressive: 为 true 且按 match_id 查询 LOL 对局时立即返回首屏数据与 token，
+            其余召唤师信息通过 Socket.IO（subscribe_match）逐个推送
     """
     summoner_name = request.args.get('name')
     index = request.args.get('index', type=int)
-    match_id = request.args.get('match_id')
+    # match_id 会作为磁盘缓存文件名的一部分，只接受正整数 gameId
+    match_id = request.args.get('match_id', type=int)
+    if request.args.get('match_id') and (match_id is None or match_id <= 0):
+        return jsonify({"success": False, "message": "match_id 必须为正整数"}), 400
     is_tft = request.args.get('is_tft', 'false').lower() == 'true'
+    progressive = request.args.get('progressive', 'false').lower() == 'true'
 
     if not app_state.is_lcu_connected():
         return jsonify({"success": False, "message": "未连接到客户端"}), 400
 
+    if progressive and match_id and not is_tft:
+        try:
+            game, token = match_streams.start(lcu.get_client(), match_id)
+        except RuntimeError as e:
+            # 无法启动后台补全线程
+            print(f"Error getting match detail: {e}")
+            return jsonify({"success": False, "message": "获取对局详情失败"}), 500
+        if game is None:
+            return jsonify({"success": False, "message": "通过 match_id 获取对局失败"}), 500
+        return jsonify({"success": True, "game": game, "token": token})
+
     token = app_state.lcu_credentials["auth_token"]
     port = app_state.lcu_credentials["app_port"]
 
@@ -244,6 +438,213 @@ def get_match():
         return jsonify({"success": False, "message": "获取对局详情失败"}), 500
 
 
+@data_bp.route('/live_game', methods=['GET'])
+def live_game():
+    """
+    返回当前进行中对局的实时数据（双方玩家 KDA/补刀/装备、对局信息、最近击杀）
+
+    数据来自游戏客户端 /liveclientdata/allgamedata，经 format_game_data 格式化；
+    同一秒内的请求共享一次拉取与格式化结果。
+    """
+    if not app_state.is_lcu_connected():
+        return jsonify({"success": False, "message": "未连接到客户端"}), 400
+
+    game = lcu.get_client().get_live_game()
+    if game is None:
+        return jsonify({"success": False, "message": "当前不在游戏中"}), 404
+
+    return jsonify({"success": True, "game": game})
+
+
+@data_bp.route('/live_events', methods=['GET'])
+def live_events():
+    """
+    返回当前对局中 EventID >= since 的事件（击杀、推塔、龙等）
+
+    查询参数:
+        since: 上次收到的最大 EventID + 1（默认0）；服务端只向游戏客户端拉取游标之后的新事件
+    """
+    since = max(request.args.get('since', 0, type=int), 0)
+
+    if not app_state.is_lcu_connected():
+        return jsonify({"success": False, "message": "未连接到客户端"}), 400
+
+    events = lcu.get_client().get_live_events(since)
+    if events is None:
+        return jsonify({"success": False, "message": "当前不在游戏中"}), 404
+
+    next_id = events[-1].get('EventID', since - 1) + 1 if events else since
+    return jsonify({"success": True, "events": events, "next": next_id})
+
+
+@data_bp.route('/get_match_timeline', methods=['GET'])
+def get_match_timeline():
+    """
+    返回单场 LOL 对局的紧凑时间线（逐分钟金币/经验/补刀 + 事件列表）
+
+    查询参数:
+        match_id: 对局 ID (gameId)
+    """
+    if not request.args.get('match_id'):
+        return jsonify({"success": False, "message": "缺少 match_id 参数"}), 400
+    match_id = request.args.get('match_id', type=int)
+    if match_id is None or match_id <= 0:
+        return jsonify({"success": False, "message": "match_id 必须为正整数"}), 400
+
+    if not app_state.is_lcu_connected():
+        return jsonify({"success": False, "message": "未连接到客户端"}), 400
+
+    timeline = lcu.get_client().get_match_timeline(match_id)
+    if timeline is None:
+        return jsonify({"success": False, "message": "获取对局时间线失败"}), 404
+
+    return jsonify({"success": True, "timeline": timeline.to_dict()})
+
+
+@data_bp.route('/champion_breakdown', methods=['GET'])
+def champion_breakdown():
+    """
+    返回召唤师的分英雄统计（场次、胜率、KDA、场均伤害等），数据来自本地战绩库的累计汇总
+
+    查询参数:
+        puuid: 召唤师 puuid，或
+        name: 召唤师名称 (格式: 名称#TAG，需要连接客户端)
+        queue_id: 可选，只统计指定队列
+        limit: 返回英雄数 (默认10，最大100)
+    """
+    queue_id = request.args.get('queue_id', type=int)
+    limit = min(max(request.args.get('limit', 10, type=int), 1), 100)
+
+    # 已连接时先同步最近的对局；未连接时直接读取已有汇总
+    puuid, error = _resolve_and_sync(request.args.get('name'), request.args.get('puuid'))
+    if error:
+        return error
+
+    champion_map = constants._get_champion_map()
+    champions = summary_store.champion_summary(puuid, queue_id=queue_id)[:limit]
+    for entry in champions:
+        entry['champion_en'] = champion_map.get(entry['champion_id'], f"Champion{entry['champion_id']}")
+
+    return jsonify({
+        "success": True,
+        "puuid": puuid,
+        "queue_id": queue_id,
+        "champions": champions,
+    })
+
+
+@data_bp.route('/augment_stats', methods=['GET'])
+def augment_stats():
+    """
+    返回召唤师在斗魂竞技场 / 海克斯大乱斗中各海克斯的场次、胜率与平均名次
+
+    查询参数:
+        puuid: 召唤师 puuid，或
+        name: 召唤师名称 (格式: 名称#TAG，需要连接客户端)
+        game_mode: 可选，CHERRY 或 KIWI
+        augment_id: 可选，只查询单个海克斯
+        limit: 返回数量 (默认30，最大200)
+    """
+    game_mode = (request.args.get('game_mode') or '').upper() or None
+    if game_mode not in (None, 'CHERRY', 'KIWI'):
+        return jsonify({"success": False, "message": f"不支持的游戏模式: {game_mode}"}), 400
+    augment_id = request.args.get('augment_id', type=int)
+    limit = min(max(request.args.get('limit', 30, type=int), 1), 200)
+
+    # 已连接时先同步最近的对局；未连接时直接读取已有汇总
+    puuid, error = _resolve_and_sync(request.args.get('name'), request.args.get('puuid'))
+    if error:
+        return error
+
+    augments = summary_store.augment_summary(puuid, game_mode=game_mode, augment_id=augment_id)[:limit]
+    table = constants.get_augment_table()
+    for entry in augments:
+        # 与 enrich_game_with_augments 相同：斗魂竞技场的海克斯在资源表中偏移 1000
+        mapped_id = entry['augment_id'] + 1000 if entry['game_mode'] == 'CHERRY' else entry['augment_id']
+        icon, name, _ = table.get(mapped_id, (None, None, None))
+        entry['name'] = name or ''
+        entry['icon'] = icon
+
+    return jsonify({
+        "success": True,
+        "puuid": puuid,
+        "game_mode": game_mode,
+        "augments": augments,
+    })
+
+
+@data_bp.route('/tft_compositions', methods=['GET'])
+def tft_compositions():
+    """
+    返回召唤师云顶之弈各阵容簇（核心羁绊组合）的场次与平均名次，数据来自本地阵容指纹索引
+
+    查询参数:
+        puuid: 召唤师 puuid，或
+        name: 召唤师名称 (格式: 名称#TAG，需要连接客户端)
+        match_id: 可选，返回与该局棋子相似的对局及其平均名次
+        similarity: 可选，相似阈值 0-1 (默认0.5)
+        min_games: 阵容簇最少场次 (默认1)
+        limit: 返回数量 (默认20，最大100)
+    """
+    match_id = request.args.get('match_id')
+    similarity = request.args.get('similarity', 0.5, type=float)
+    if not 0 < similarity <= 1:
+        return jsonify({"success": False, "message": "similarity 需在 0 到 1 之间"}), 400
+    min_games = max(request.args.get('min_games', 1, type=int), 1)
+    limit = min(max(request.args.get('limit', 20, type=int), 1), 100)
+
+    # 已连接时先同步最近的 TFT 对局；未连接时直接读取已有索引
+    puuid, error = _resolve_and_sync(
+        request.args.get('name'), request.args.get('puuid'),
+        sync=lambda client, puuid: client.get_tft_match_history(puuid, count=20),
+    )
+    if error:
+        return error
+
+    result = {
+        "success": True,
+        "puuid": puuid,
+        "clusters": tft_index.clusters(puuid, min_games=min_games)[:limit],
+    }
+    if match_id:
+        similar = tft_index.similar(puuid, match_id, threshold=similarity)
+        if similar is None:
+            return jsonify({"success": False, "message": f"对局 {match_id} 不在本地阵容索引中"}), 404
+        result["similar"] = similar
+    return jsonify(result)
+
+
+@data_bp.route('/co_players', methods=['GET'])
+def co_players():
+    """
+    返回与指定召唤师同队次数最多的玩家（双排/组排识别），数据来自本地同场玩家索引
+
+    查询参数:
+        puuid: 召唤师 puuid，或
+        name: 召唤师名称 (格式: 名称#TAG，需要连接客户端)
+        limit: 返回人数 (默认10，最大50)
+        min_games: 至少同队场数 (默认2)
+    """
+    limit = min(max(request.args.get('limit', 10, type=int), 1), 50)
+    min_games = max(request.args.get('min_games', 2, type=int), 1)
+
+    # 已连接时先把磁盘中已缓存的对局补录进索引；未连接时仍可直接查询已有索引
+    puuid, error = _resolve_and_sync(
+        request.args.get('name'), request.args.get('puuid'),
+        sync=lambda client, puuid: backfill_coplayer_index(client),
+    )
+    if error:
+        return error
+
+    total_games, players = coplayer_index.co_players(puuid, limit=limit, min_games=min_games)
+    return jsonify({
+        "success": True,
+        "puuid": puuid,
+        "indexed_games": total_games,
+        "co_players": players,
+    })
+
+
 @data_bp.route('/external/champion_stats', methods=['GET'])
 def external_champion_stats():
     """Return external champion stats (placeholder-backed).
@@ -324,27 +725,15 @@ def get_summoner_stats(game_name, tag_line):
     
     # 获取最近20场战绩计算胜率
     try:
-        history = client.get_match_history(puuid, count=20, begin_index=0)
-        if not history:
+        records = client.get_match_summaries(puuid, count=20, begin_index=0)
+        if records is None:
             return jsonify({'wins': 0, 'losses': 0, 'winrate': 0})
         
-        games = history.get('games', {}).get('games', [])
-        wins = 0
-        losses = 0
-        
-        for game in games:
-            participants = game.get('participants', [])
-            for p in participants:
-                if p.get('puuid') == puuid:
-                    stats = p.get('stats', {})
-                    if stats.get('win', False):
-                        wins += 1
-                    else:
-                        losses += 1
-                    break
-        
-        total = wins + losses
-        winrate = round((wins / total * 100), 1) if total > 0 else 0
+        # 按 gameId 汇总刚拉取的这些对局，不假设它们恰好是本地库的最新几行
+        stats = _page_stats(puuid, records, by_champion=False)
+        wins = stats['wins']
+        losses = stats['losses']
+        winrate = stats['win_rate']
         
         ranked_data = client.get_ranked_stats(summoner_id=summoner_id, puuid=puuid) or {}
         queues = ranked_data.get('queues', []) if isinstance(ranked_data, dict) else []
@@ -353,6 +742,8 @@ def get_summoner_stats(game_name, tag_line):
             'wins': wins,
             'losses': losses,
             'winrate': winrate,
+            'kda': stats['kda'],
+            'cs_per_min': stats['cs_per_min'],
             'queues': queues,
         })
     except Exception as e:
@@ -37,36 +37,14 @@ def index():
                 
                 # 获取最近5场战绩
                 if current_summoner['puuid']:
-                    history = client.get_match_history(current_summoner['puuid'], count=5, begin_index=0)
-                    if history:
-                        games_data = history.get('games', {}).get('games', [])
-                        for game in games_data[:5]:
-                            participants = game.get('participants', [])
-                            player_stats = None
-                            for p in participants:
-                                if p.get('puuid') == current_summoner['puuid']:
-                                    player_stats = p
-                                    break
-                            
-                            if not player_stats and participants:
-                                player_stats = participants[0]
-                            
-                            win = False
-                            if player_stats:
-                                stats = player_stats.get('stats', {})
-                                win = stats.get('win', False)
-                            
-                            queue_id = game.get('queueId', 0)
-                            queue_name = _get_queue_name(queue_id)
-                            
-                            game_creation = game.get('gameCreation', 0)
-                            time_ago = _format_time_ago(game_creation)
-                            
+                    records = client.get_match_summaries(current_summoner['puuid'], count=5, begin_index=0)
+                    if records:
+                        for record in records[:5]:
                             recent_games.append({
-                                'win': win,
-                                'queue_name': queue_name,
-                                'time_ago': time_ago,
-                                'champion_id': player_stats.get('championId', 0) if player_stats else 0
+                                'win': record.win,
+                                'queue_name': _get_queue_name(record.queue_id),
+                                'time_ago': _format_time_ago(record.game_creation),
+                                'champion_id': record.champion_id
                             })
         except Exception as e:
             print(f"Error fetching recent games: {e}")
@@ -67,6 +67,16 @@ def _extract_subteam_id(player_data):
 
     return None
 
+def format_kill_event(event):
+    """格式化一条 ChampionKill 事件"""
+    return {
+        'killer': event.get('KillerName', ''),
+        'victim': event.get('VictimName', ''),
+        'assisters': event.get('Assisters') or [],
+        'time': round(event.get('EventTime', 0), 1)
+    }
+
+
 def format_player_info(player_data, active_player_name):
     """
     格式化单个玩家的详细信息
@@ -205,12 +215,13 @@ def format_player_info(player_data, active_player_name):
     }
 
 
-def format_game_data(all_game_data):
+def format_game_data(all_game_data, recent_kills=None):
     """
     格式化完整游戏数据
     
     Args:
         all_game_data: 从 /liveclientdata/allgamedata 获取的完整数据
+        recent_kills: 已由事件游标维护好的最近击杀（最新在前）；为 None 时从 events 中倒序扫描
     
     Returns:
         dict: 包含格式化后的玩家列表和游戏信息
@@ -302,26 +313,22 @@ def format_game_data(all_game_data):
     }
     
     # 提取事件信息（最近击杀等）
-    events_data = all_game_data.get('events')
-    if events_data is None or not isinstance(events_data, dict):
-        events_data = {}
-    
-    events = events_data.get('Events', [])
-    if events is None or not isinstance(events, list):
-        events = []
-    
-    recent_kills = []
-    
-    for event in reversed(events):
-        if event and event.get('EventName') == 'ChampionKill':
-            recent_kills.append({
-                'killer': event.get('KillerName', ''),
-                'victim': event.get('VictimName', ''),
-                'assisters': event.get('Assisters') or [],
-                'time': round(event.get('EventTime', 0), 1)
-            })
-            if len(recent_kills) >= 10:  # 只保留最近10次击杀
-                break
+    if recent_kills is None:
+        events_data = all_game_data.get('events')
+        if events_data is None or not isinstance(events_data, dict):
+            events_data = {}
+
+        events = events_data.get('Events', [])
+        if events is None or not isinstance(events, list):
+            events = []
+
+        recent_kills = []
+
+        for event in reversed(events):
+            if event and event.get('EventName') == 'ChampionKill':
+                recent_kills.append(format_kill_event(event))
+                if len(recent_kills) >= 10:  # 只保留最近10次击杀
+                    break
     
     return {
         'teammates': teammates,
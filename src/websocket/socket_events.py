@@ -2,10 +2,16 @@
 WebSocket事件处理模块
 """
 import threading
-from flask_socketio import emit
+from flask import request
+from flask_socketio import emit, join_room, leave_room
 from config import app_state
 from core.services import auto_accept_task, auto_analyze_task, auto_banpick_task
+from core.services.match_service import process_lol_summaries
+from core.services.match_stream import add_stream_listener, match_streams
+from core.services.live_publisher import LIVE_GAME_ROOM, add_live_listener, live_publisher
 from core import lcu
+from core.lcu.match_history import add_history_listener
+from core.store.metrics import MetricColumns
 from utils.logger import logger
 
 
@@ -13,6 +19,12 @@ from utils.logger import logger
 _detect_thread = None
 _detect_thread_lock = threading.Lock()
 
+# 只读订阅连接（战绩详情页等）：不触发 LCU 探测，断开时也不广播 server_shutdown
+_viewer_sids = set()
+
+# 战绩刷新推送的场次（即详情页第一页）
+HISTORY_PUSH_COUNT = 20
+
 
 def _emit_lcu_status(emitter, connected=None):
     """Emit a structured LCU status event for frontend state sync."""
@@ -64,10 +76,39 @@ def register_socket_events(socketio):
         socketio: Flask-SocketIO实例
     """
     thread_lock = threading.Lock()
+
+    def _push_history_update(puuid, records):
+        """后台刷新发现新对局时，把最新第一页推送给订阅该 puuid 的页面。"""
+        page = records[:HISTORY_PUSH_COUNT]
+        games = process_lol_summaries(page)
+        stats = MetricColumns.from_records(page).aggregate(by_champion=True)
+        socketio.emit(
+            'history_updated',
+            {'puuid': puuid, 'games': games, 'stats': stats, 'page': 1, 'count': len(games)},
+            to=f"history:{puuid}"
+        )
+
+    add_history_listener(_push_history_update)
+
+    def _push_match_stream(event, token, payload):
+        """渐进式补全的参与者信息推送到该令牌的房间。"""
+        socketio.emit(event, payload, to=f"match:{token}")
+
+    add_stream_listener(_push_match_stream)
+
+    def _push_live_game(event, payload):
+        """实时对局关键帧/增量推送给订阅的页面。"""
+        socketio.emit(event, payload, to=LIVE_GAME_ROOM)
+
+    add_live_listener(_push_live_game)
     
     @socketio.on('connect')
-    def handle_connect():
+    def handle_connect(auth=None):
         """客户端连接事件"""
+        if isinstance(auth, dict) and auth.get('role') == 'viewer':
+            _viewer_sids.add(request.sid)
+            return
+
         print('浏览器客户端已连接，触发自动检测...')
         status_proxy = SocketIOMessageProxy(socketio)
         status_proxy.showMessage('已连接到本地服务器，开始自动检测LCU...')
@@ -89,6 +130,11 @@ def register_socket_events(socketio):
     @socketio.on('disconnect')
     def handle_disconnect():
         """客户端断开连接事件"""
+        live_publisher.unsubscribe(request.sid)
+        if request.sid in _viewer_sids:
+            _viewer_sids.discard(request.sid)
+            return
+
         print('浏览器客户端已断开连接')
         # 当检测到任一客户端断开时，通知其他已连接的客户端关闭页面。
         # 这会触发前端的 `server_shutdown` 处理器（尝试关闭窗口或显示提示）。
@@ -100,6 +146,39 @@ def register_socket_events(socketio):
         # 不重置功能开关，但清理线程状态标记
         # 这样如果用户刷新页面，重新连接后可以重新启动功能
     
+    @socketio.on('subscribe_history')
+    def handle_subscribe_history(data=None):
+        """订阅某个 puuid 的战绩更新推送"""
+        puuid = (data or {}).get('puuid')
+        if puuid:
+            join_room(f"history:{puuid}")
+
+    @socketio.on('subscribe_live_game')
+    def handle_subscribe_live_game(data=None):
+        """订阅实时对局增量推送；（重新）订阅时先发送一次完整关键帧"""
+        join_room(LIVE_GAME_ROOM)
+        keyframe = live_publisher.subscribe(request.sid)
+        if keyframe:
+            emit('live_game_keyframe', keyframe)
+
+    @socketio.on('unsubscribe_live_game')
+    def handle_unsubscribe_live_game(data=None):
+        leave_room(LIVE_GAME_ROOM)
+        live_publisher.unsubscribe(request.sid)
+
+    @socketio.on('subscribe_match')
+    def handle_subscribe_match(data=None):
+        """订阅对局详情的渐进式补全推送，并补发订阅前已推送的内容"""
+        token = (data or {}).get('token')
+        if not token:
+            return
+        events = match_streams.replay(token, join=lambda: join_room(f"match:{token}"))
+        if events is None:
+            emit('match_enriched', {'token': token, 'expired': True})
+            return
+        for event, payload in events:
+            emit(event, payload)
+
     @socketio.on('start_auto_accept')
     def handle_start_auto_accept():
         """启动自动接受对局"""
@@ -436,22 +436,32 @@ document.addEventListener("DOMContentLoaded", () => {
                 return bTime - aTime; // newest first
               });
 
-              games.forEach((g) => {
-                const winFlag =
-                  g.win === true ||
-                  g.result === "Win" ||
-                  g.win_status === "Win" ||
-                  g.stats?.win === true;
-                if (winFlag) wins += 1;
-                else losses += 1;
-
-                const k = g.kills ?? g.stats?.kills ?? 0;
-                const d = g.deaths ?? g.stats?.deaths ?? 0;
-                const a = g.assists ?? g.stats?.assists ?? 0;
-                totalKills += k;
-                totalDeaths += d;
-                totalAssists += a;
-              });
+              // 优先使用后端列式汇总（get_history 的 stats 字段）
+              const serverStats = histJson?.stats;
+              if (serverStats) {
+                wins = serverStats.wins;
+                losses = serverStats.losses;
+                totalKills = serverStats.kills;
+                totalDeaths = serverStats.deaths;
+                totalAssists = serverStats.assists;
+              } else {
+                games.forEach((g) => {
+                  const winFlag =
+                    g.win === true ||
+                    g.result === "Win" ||
+                    g.win_status === "Win" ||
+                    g.stats?.win === true;
+                  if (winFlag) wins += 1;
+                  else losses += 1;
+
+                  const k = g.kills ?? g.stats?.kills ?? 0;
+                  const d = g.deaths ?? g.stats?.deaths ?? 0;
+                  const a = g.assists ?? g.stats?.assists ?? 0;
+                  totalKills += k;
+                  totalDeaths += d;
+                  totalAssists += a;
+                });
+              }
 
               for (const g of games) {
                 const winFlag =
@@ -497,6 +507,30 @@ document.addEventListener("DOMContentLoaded", () => {
           }
         };
 
+        // 与当前召唤师的历史同场记录（由后端 shared_history 字段提供）
+        const formatSharedHistory = (shared) => {
+          if (!shared) return "";
+          const parts = [];
+          if (shared.with.games) {
+            parts.push(
+              `同队 ${shared.with.wins}胜${shared.with.games - shared.with.wins}负`,
+            );
+          }
+          if (shared.against.games) {
+            parts.push(
+              `交手 ${shared.against.wins}胜${shared.against.games - shared.against.wins}负`,
+            );
+          }
+          return parts.join(" · ");
+        };
+
+        const sharedHistoryTitle = (shared) => {
+          if (!shared || !shared.last_seen) return "";
+          const relation = shared.last_together ? "同队" : "交手";
+          const result = shared.last_win ? "胜利" : "失败";
+          return `上次相遇: ${timeAgo(shared.last_seen)}（${relation}${result}）`;
+        };
+
         const getChampionIcon = (championId) => {
           if (!championId) return null;
           const name = championById.value[championId];
@@ -576,6 +610,8 @@ document.addEventListener("DOMContentLoaded", () => {
           enemies,
           activeModulesCount,
           getChampionIcon,
+          formatSharedHistory,
+          sharedHistoryTitle,
           navigateTo,
           searchSummoner,
           searchTFT,
@@ -44,26 +44,15 @@ export async function fetchSummonerStats(
 
     if (data.success && data.games && data.games.length > 0) {
       const games = data.games;
-      const totalGames = games.length;
-      const wins = games.filter((game) => game.win).length;
-      const losses = totalGames - wins;
-      const winRate = ((wins / totalGames) * 100).toFixed(1);
       const streakInfo = calculateCurrentStreak(games);
 
-      // 计算KDA平均值
-      let totalKills = 0,
-        totalDeaths = 0,
-        totalAssists = 0;
-      games.forEach((game) => {
-        const kdaParts = game.kda.split("/");
-        totalKills += parseInt(kdaParts[0]) || 0;
-        totalDeaths += parseInt(kdaParts[1]) || 0;
-        totalAssists += parseInt(kdaParts[2]) || 0;
-      });
-      const avgKDA =
-        totalDeaths > 0
-          ? ((totalKills + totalAssists) / totalDeaths).toFixed(2)
-          : "Perfect";
+      // 胜率与 KDA 由后端列式汇总计算（get_history 的 stats 字段）
+      const stats = data.stats;
+      const totalGames = stats.games;
+      const wins = stats.wins;
+      const losses = stats.losses;
+      const winRate = stats.win_rate.toFixed(1);
+      const avgKDA = stats.kda !== null ? stats.kda.toFixed(2) : "Perfect";
 
       // 提取最近一场数据
       const lastGame = games[0];
@@ -0,0 +1,94 @@
+"""实时对局增量推送：按顺序把增量应用到关键帧上，应得到与下一关键帧相同的数据。"""
+import copy
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), os.pardir, 'src'))
+
+from core.services.live_publisher import LiveGamePublisher, player_key  # noqa: E402
+
+
+def _player(name, team):
+    return {
+        'summonerName': name, 'riotId': f'{name}#T', 'team': team,
+        'kills': 0, 'deaths': 0, 'assists': 0, 'cs': 0, 'kda': '0/0/0',
+        'items': [], 'level': 1, 'isDead': False, 'respawnTimer': 0,
+        'runes': {'keystone': 8010}, 'spells': ['SummonerFlash', 'SummonerDot'],
+    }
+
+
+def _frames(count):
+    """模拟一局：每帧有人补刀、升级或阵亡，偶尔有击杀事件。"""
+    game = {
+        'teammates': [_player(f'ally{i}', 'ORDER') for i in range(5)],
+        'enemies': [_player(f'enemy{i}', 'CHAOS') for i in range(5)],
+        'gameInfo': {'gameTime': 0.0},
+        'recentKills': [],
+    }
+    frames = []
+    for tick in range(1, count + 1):
+        game = copy.deepcopy(game)
+        game['gameInfo']['gameTime'] = float(tick)
+        farmer = game['teammates'][tick % 5]
+        farmer['cs'] += 7
+        farmer['level'] = min(18, 1 + tick // 3)
+        if tick % 4 == 0:
+            killer, victim = game['teammates'][tick % 5], game['enemies'][tick % 5]
+            killer['kills'] += 1
+            killer['items'] = killer['items'] + [1000 + tick]
+            victim['deaths'] += 1
+            victim['isDead'] = True
+            victim['respawnTimer'] = 10.0
+            game['recentKills'] = game['recentKills'][-2:] + [{'killer': killer['riotId'], 'time': tick}]
+        for player in game['teammates'] + game['enemies']:
+            player['kda'] = f"{player['kills']}/{player['deaths']}/{player['assists']}"
+        frames.append(game)
+    return frames
+
+
+def _apply(game, delta):
+    players = {player_key(p): p for side in ('teammates', 'enemies') for p in game[side]}
+    for key, fields in delta['players'].items():
+        players[key].update(fields)
+    game['gameInfo'] = delta['gameInfo']
+    if 'recentKills' in delta:
+        game['recentKills'] = delta['recentKills']
+
+
+def test_deltas_rebuild_next_keyframe():
+    publisher = LiveGamePublisher(keyframe_interval=10)
+    rebuilt = None
+    tick = None
+    keyframes = 0
+
+    for frame in _frames(35):
+        event, payload = publisher.step(copy.deepcopy(frame))
+        if event == 'live_game_keyframe':
+            keyframes += 1
+            rebuilt = copy.deepcopy(payload['game'])
+        else:
+            assert event == 'live_game_delta'
+            assert payload['base'] == tick
+            _apply(rebuilt, payload)
+        tick = payload['tick']
+        # 此刻重新订阅的页面收到的关键帧
+        assert rebuilt == frame == publisher._keyframe_payload()['game']
+
+    assert keyframes == 4
+
+
+def test_roster_change_forces_keyframe():
+    publisher = LiveGamePublisher()
+    first, second = _frames(2)
+    second['enemies'][0]['riotId'] = 'swapped#T'
+
+    assert publisher.step(first)[0] == 'live_game_keyframe'
+    assert publisher.step(second)[0] == 'live_game_keyframe'
+
+
+def test_game_end_is_reported_once():
+    publisher = LiveGamePublisher()
+    publisher.step(_frames(1)[0])
+
+    assert publisher.step(None)[0] == 'live_game_ended'
+    assert publisher.step(None) is None